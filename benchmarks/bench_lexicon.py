@@ -0,0 +1,74 @@
+"""Sentiment scoring throughput (messages/second) against lexicon size.
+
+Usage: python benchmarks/bench_lexicon.py [--sizes 10,1000,10000,50000] [--messages 5000]
+
+Synthetic lexicons mix single words with 2-3 word expressions (~20%);
+messages draw about a third of their tokens from the lexicon.
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import sentiment_analyzer as sa  # noqa: E402
+
+KINDS = [sa.POSITIVE, sa.NEGATIVE, sa.INTENSIFIER, sa.NEGATION]
+
+
+def make_word(rng: random.Random) -> str:
+    return "".join(rng.choice("abcdefghijklmnopqrstuvwxyzáéíóúãõç") for _ in range(rng.randint(3, 10)))
+
+
+def make_lexicon(size: int, rng: random.Random):
+    lexicon = sa.Lexicon(sa.POSITIVE_WORDS, sa.NEGATIVE_WORDS, sa.INTENSIFIERS, sa.NEGATIONS)
+    expressions = []
+    while lexicon.size < size:
+        words = [make_word(rng) for _ in range(1 if rng.random() < 0.8 else rng.randint(2, 3))]
+        expression = " ".join(words)
+        lexicon.add(expression, rng.choice(KINDS))
+        expressions.append(expression)
+    return lexicon, expressions or sa.POSITIVE_WORDS + sa.NEGATIVE_WORDS
+
+
+def make_messages(n: int, expressions, rng: random.Random):
+    filler = [make_word(rng) for _ in range(2000)]
+    messages = []
+    for _ in range(n):
+        parts = [rng.choice(expressions) if rng.random() < 0.33 else rng.choice(filler) for _ in range(rng.randint(4, 30))]
+        messages.append(" ".join(parts)[:280])
+    return messages
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10,1000,10000,50000")
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"{'lexicon':>9} {'build ms':>9} {'msg/s':>10}")
+    for size in (int(x) for x in args.sizes.split(",")):
+        rng = random.Random(args.seed)
+        t0 = time.perf_counter()
+        lexicon, expressions = make_lexicon(size, rng)
+        build_ms = (time.perf_counter() - t0) * 1000
+        messages = make_messages(args.messages, expressions, rng)
+
+        sa.set_lexicon(lexicon)
+        try:
+            t0 = time.perf_counter()
+            for content in messages:
+                sa._lexicon_sentiment(content, False)
+            elapsed = time.perf_counter() - t0
+        finally:
+            sa.set_lexicon(None)
+        print(f"{lexicon.size:>9} {build_ms:>9.1f} {len(messages) / elapsed:>10.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+"""Memory footprint of the /analyze-feed path, by stage, with budget enforcement.
+
+Usage: python benchmarks/bench_memory.py [--messages 10000] [--budget-mb 20]
+                                         [--stage-budget ingest=2 ...] [--profile default]
+
+Replays what the endpoint does with a request body under tracemalloc:
+    fast_decode   orjson decode and shape check of the fast ingestion path
+  and, only for bodies the fast path hands over to the pydantic route:
+    json_decode   json.loads of the body (FastAPI does this and keeps the result)
+    validation    AnalyzeFeedRequest.model_validate
+    model_dump    the list of message dicts handed to analyze_feed
+  then:
+    ingest        analyze_feed up to the last folded message (retained state)
+    result        the rest of analyze_feed (trending, influence, anomalies)
+    encode        response rendering (FastJSONResponse)
+For each stage it reports the memory still held afterwards ("retained") and the
+transient peak above the level at which the stage started. The total peak
+covers the whole path, including the request body, which is held throughout.
+Exits 1 when the total peak or a stage's peak exceeds its budget. ru_maxrss is
+printed for reference only: it is process-wide and includes the interpreter
+and imported modules.
+"""
+import argparse
+import gc
+import json
+import resource
+import sys
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import fast_ingest  # noqa: E402
+import sentiment_analyzer  # noqa: E402
+from benchmarks.datasets import NOW, PROFILES, generate_feed  # noqa: E402
+from main import AnalyzeFeedRequest, FastJSONResponse  # noqa: E402
+
+MB = 1024 * 1024
+
+
+class _IngestMark:
+    # Instrumentation recorder: notes traced memory once every message is folded
+    def __init__(self) -> None:
+        self.current = None
+        self.peak = None
+
+    def stage(self, name: str, seconds: float) -> None:
+        pass
+
+    def feed(self, messages: int) -> None:
+        if self.current is None:
+            self.current, self.peak = tracemalloc.get_traced_memory()
+
+
+def measure(body: bytes) -> Tuple[int, List[Tuple[str, int, int]]]:
+    # Returns (total peak, [(stage, retained, transient peak)]) in bytes
+    stages: List[Tuple[str, int, int]] = [("body", len(body), len(body))]
+    gc.collect()
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+
+        def step(name, fn):
+            start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            value = fn()
+            current, peak = tracemalloc.get_traced_memory()
+            stages.append((name, current - start, peak - start))
+            return value
+
+        tracemalloc.reset_peak()
+        overall_peak = 0
+        parsed = step("fast_decode", lambda: fast_ingest.parse_feed(body))
+        overall_peak = max(overall_peak, tracemalloc.get_traced_memory()[1])
+        if parsed is not None:
+            messages, time_window_minutes = parsed[:2]
+        else:
+            # Not eligible for the fast path: the route decodes again and goes through pydantic
+            data = step("json_decode", lambda: json.loads(body))
+            overall_peak = max(overall_peak, tracemalloc.get_traced_memory()[1])
+            payload = step("validation", lambda: AnalyzeFeedRequest.model_validate(data))
+            overall_peak = max(overall_peak, tracemalloc.get_traced_memory()[1])
+            # `data` stays alive: Starlette caches the decoded body on the request
+            messages = step("model_dump", lambda: [m.model_dump() for m in payload.messages])
+            overall_peak = max(overall_peak, tracemalloc.get_traced_memory()[1])
+            time_window_minutes = payload.time_window_minutes
+
+        mark = _IngestMark()
+        start = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        sentiment_analyzer.set_instrumentation(mark)
+        try:
+            result = sentiment_analyzer.analyze_feed(messages, time_window_minutes, NOW)
+        finally:
+            sentiment_analyzer.set_instrumentation(None)
+        current, peak = tracemalloc.get_traced_memory()
+        overall_peak = max(overall_peak, peak)
+        stages.append(("ingest", mark.current - start, mark.peak - start))
+        stages.append(("result", current - mark.current, peak - mark.current))
+
+        step("encode", lambda: FastJSONResponse(status_code=200, content=result).body)
+        overall_peak = max(overall_peak, tracemalloc.get_traced_memory()[1])
+    finally:
+        tracemalloc.stop()
+    # The body was allocated before tracing started; it is held for the whole request
+    return len(body) + overall_peak - base, stages
+
+
+def _parse_stage_budgets(values: List[str]) -> Dict[str, float]:
+    budgets = {}
+    for value in values:
+        name, _, mb = value.partition("=")
+        budgets[name] = float(mb)
+    return budgets
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=10000)
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="default")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--budget-mb", type=float, default=20.0, help="limit for the total peak")
+    parser.add_argument("--stage-budget", action="append", default=[], metavar="STAGE=MB")
+    args = parser.parse_args()
+
+    payload = generate_feed(args.messages, PROFILES[args.profile], seed=args.seed)
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    del payload
+    sentiment_analyzer.analyze_feed([], 30, NOW)  # import-time and first-call allocations out of the way
+
+    total, stages = measure(body)
+    budgets = _parse_stage_budgets(args.stage_budget)
+
+    failures = []
+    print(f"messages: {args.messages}  request body: {len(body) / MB:.2f} MB")
+    print(f"{'stage':<12} {'retained MB':>12} {'peak MB':>9} {'budget':>8}")
+    for name, retained, peak in stages:
+        budget = budgets.get(name)
+        over = budget is not None and peak / MB > budget
+        if over:
+            failures.append(name)
+        print(f"{name:<12} {retained / MB:>12.2f} {peak / MB:>9.2f} {budget if budget is not None else '-':>8}{'  OVER' if over else ''}")
+    over = total / MB > args.budget_mb
+    print(f"{'total peak':<12} {'':>12} {total / MB:>9.2f} {args.budget_mb:>8}{'  OVER' if over else ''}")
+    print(f"ru_maxrss: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MB (process)")
+    if over:
+        failures.append("total")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""Sentiment scoring speedup of the worker pool across pool sizes.
+
+Usage: python benchmarks/bench_parallel.py [--messages 50000] [--workers 1,2,4,8] [--repeat 3]
+
+Times `analyze_feed` on a synthetic feed with varied content, first serially
+and then with `start_scoring_pool(n)` for each pool size; pool start-up is
+excluded since the pool is persistent. Speedup is bounded by the cores
+available and by the serial stages (validation, aggregation).
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import sentiment_analyzer as sa  # noqa: E402
+
+WORDS = sa.POSITIVE_WORDS + sa.NEGATIVE_WORDS + sa.INTENSIFIERS + sa.NEGATIONS + [
+    "produto", "entrega", "atendimento", "preço", "qualidade", "hoje", "semana", "loja", "app", "mbras",
+]
+
+
+def make_feed(n: int, seed: int):
+    rng = random.Random(seed)
+    now = datetime(2025, 9, 10, 11, 0, 0, tzinfo=timezone.utc)
+    messages = []
+    for i in range(n):
+        content = " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 40)))[:280]
+        messages.append({
+            "id": f"msg_{i}",
+            "content": content,
+            "timestamp": (now - timedelta(seconds=rng.randint(0, 7200))).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "user_id": f"user_{rng.randint(0, n // 10):05d}",
+            "hashtags": rng.sample(["#produto", "#entrega", "#promo", "#app"], rng.randint(0, 2)),
+            "reactions": rng.randint(0, 50),
+            "shares": rng.randint(0, 10),
+            "views": rng.randint(1, 1000),
+        })
+    return messages, now
+
+
+def best_of(repeat: int, messages, now) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            t0 = time.perf_counter()
+            sa.analyze_feed(messages, 30, now)
+            best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=50000)
+    parser.add_argument("--workers", default="1,2,4,8")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    messages, now = make_feed(args.messages, args.seed)
+    sa.PARALLEL_MIN_MESSAGES = 0
+    serial = best_of(args.repeat, messages, now)
+    with contextlib.redirect_stdout(io.StringIO()):
+        expected = sa.analyze_feed(messages, 30, now)
+
+    print(f"cpus: {os.cpu_count()}  messages: {len(messages)}")
+    print(f"{'workers':>7} {'ms':>9} {'speedup':>8}")
+    print(f"{'serial':>7} {serial * 1000:>9.1f} {1.0:>8.2f}")
+    for workers in (int(x) for x in args.workers.split(",")):
+        sa.start_scoring_pool(workers)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                if sa.analyze_feed(messages, 30, now) != expected:
+                    print(f"{workers} workers: result differs from serial run")
+                    return 1
+            elapsed = best_of(args.repeat, messages, now)
+        finally:
+            sa.stop_scoring_pool()
+        print(f"{workers:>7} {elapsed * 1000:>9.1f} {serial / elapsed:>8.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""Compare analyze_feed against a reference revision of sentiment_analyzer.py.
+
+Usage: python benchmarks/bench_pipeline.py [--ref REV] [--sizes 1000,10000,100000]
+
+The reference module is loaded straight from git, so any commit can serve as
+the baseline. By default it is the repository's root commit, the code before
+any optimization. Outputs must be byte-identical; timings are best-of-N.
+"""
+import argparse
+import contextlib
+import copy
+import io
+import json
+import subprocess
+import sys
+import time
+import types
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import sentiment_analyzer  # noqa: E402
+from examples.generate_performance_data import generate  # noqa: E402
+
+NOW = datetime(2025, 9, 10, 11, 0, 0, tzinfo=timezone.utc)
+
+
+def baseline_revision() -> str:
+    # Root commit: the unoptimized implementation every change is compared against
+    return subprocess.run(
+        ["git", "rev-list", "--max-parents=0", "HEAD"],
+        cwd=ROOT, check=True, capture_output=True, text=True,
+    ).stdout.split()[-1]
+
+
+def load_reference(ref: str) -> types.ModuleType:
+    source = subprocess.run(
+        ["git", "show", f"{ref}:sentiment_analyzer.py"],
+        cwd=ROOT, check=True, capture_output=True, text=True,
+    ).stdout
+    module = types.ModuleType("sentiment_analyzer_ref")
+    sys.modules[module.__name__] = module  # dataclasses resolve annotations through sys.modules
+    exec(compile(source, f"{ref}:sentiment_analyzer.py", "exec"), module.__dict__)
+    return module
+
+
+def run(module, payload, repeat):
+    best = float("inf")
+    output = None
+    for _ in range(repeat):
+        msgs = copy.deepcopy(payload["messages"])  # the reference mutates its input
+        with contextlib.redirect_stdout(io.StringIO()):
+            t0 = time.perf_counter()
+            result = module.analyze_feed(msgs, payload["time_window_minutes"], NOW)
+            best = min(best, time.perf_counter() - t0)
+        output = json.dumps(result, ensure_ascii=False)
+    return best * 1000, output
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ref", help="git revision used as baseline (default: the root commit)")
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    reference = load_reference(args.ref or baseline_revision())
+    print(f"{'messages':>10} {'ref ms':>10} {'current ms':>11} {'speedup':>8}  identical")
+    ok = True
+    for n in (int(x) for x in args.sizes.split(",")):
+        payload = generate(n)
+        ref_ms, ref_out = run(reference, payload, args.repeat)
+        cur_ms, cur_out = run(sentiment_analyzer, payload, args.repeat)
+        same = ref_out == cur_out
+        ok = ok and same
+        print(f"{n:>10} {ref_ms:>10.1f} {cur_ms:>11.1f} {ref_ms / cur_ms:>7.2f}x  {same}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
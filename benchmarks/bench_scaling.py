@@ -0,0 +1,189 @@
+"""Scaling benchmark: per-stage and HTTP timings across feed sizes, with regression baselines.
+
+Usage:
+    python benchmarks/bench_scaling.py run [--sizes 1000,10000,100000] [--profile default]
+                                           [--repeat 3] [--no-http] [--output results.json]
+    python benchmarks/bench_scaling.py compare baseline.json results.json [--tolerance 0.15] [--min-ms 2]
+
+`run` times, for each size (median of --repeat runs):
+    total_ms    analyze_feed with instrumentation off
+    stages_ms   per-stage durations from the metrics instrumentation (separate runs,
+                since per-message timing adds its own overhead)
+    http_ms     POST /analyze-feed through the ASGI app, pre-encoded body
+and writes them as JSON. `compare` exits 1 when any timing exceeds the baseline by
+more than the tolerance (and by more than --min-ms, to ignore sub-millisecond noise).
+Add 1000000 to --sizes for the 1M-message run (several GB of RAM unless --no-http).
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import sentiment_analyzer  # noqa: E402
+from benchmarks.datasets import NOW, PROFILES, generate_feed  # noqa: E402
+
+
+class StageRecorder:
+    def __init__(self) -> None:
+        self.stages: Dict[str, float] = {}
+
+    def stage(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def feed(self, messages: int) -> None:
+        pass
+
+
+def _median_ms(samples: List[float]) -> float:
+    return round(statistics.median(samples) * 1000, 3)
+
+
+def bench_size(n: int, profile_name: str, repeat: int, http: bool, seed: int) -> Dict[str, Any]:
+    payload = generate_feed(n, PROFILES[profile_name], seed=seed)
+    messages, window = payload["messages"], payload["time_window_minutes"]
+
+    sentiment_analyzer.analyze_feed(messages, window, NOW)  # warm the normalization and follower caches
+    totals = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        sentiment_analyzer.analyze_feed(messages, window, NOW)
+        totals.append(time.perf_counter() - t0)
+
+    per_stage: Dict[str, List[float]] = {}
+    for _ in range(repeat):
+        recorder = StageRecorder()
+        sentiment_analyzer.set_instrumentation(recorder)
+        try:
+            sentiment_analyzer.analyze_feed(messages, window, NOW)
+        finally:
+            sentiment_analyzer.set_instrumentation(None)
+        for name, seconds in recorder.stages.items():
+            per_stage.setdefault(name, []).append(seconds)
+
+    result = {
+        "messages": n,
+        "total_ms": _median_ms(totals),
+        "stages_ms": {name: _median_ms(samples) for name, samples in per_stage.items()},
+    }
+    if http:
+        from fastapi.testclient import TestClient
+        from main import RESULT_CACHE, app
+
+        # Anchored at NOW like the in-process runs; otherwise the wall clock would leave the
+        # generated feed outside the window. The analyzer only takes RFC3339 with 'Z'.
+        body = json.dumps(
+            {**payload, "reference_time": NOW.strftime("%Y-%m-%dT%H:%M:%SZ")}, ensure_ascii=False
+        ).encode("utf-8")
+        samples = []
+        with TestClient(app) as client:
+            for _ in range(repeat):
+                RESULT_CACHE.clear()  # a fixed reference_time makes the request cacheable
+                t0 = time.perf_counter()
+                resp = client.post("/analyze-feed", content=body, headers={"Content-Type": "application/json"})
+                samples.append(time.perf_counter() - t0)
+                assert resp.status_code == 200, resp.text
+        result["http_ms"] = _median_ms(samples)
+        result["request_bytes"] = len(body)
+    return result
+
+
+def _git_revision() -> str:
+    proc = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+    return proc.stdout.strip() or "unknown"
+
+
+def cmd_run(args: argparse.Namespace) -> int:
+    sizes = [int(x) for x in args.sizes.split(",")]
+    report = {
+        "meta": {
+            "created": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "machine": platform.platform(),
+            "numpy": sentiment_analyzer.np is not None,
+            "profile": args.profile,
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+        "results": {},
+    }
+    print(f"{'messages':>9} {'total ms':>10} {'http ms':>10}  stages (ms)")
+    for n in sizes:
+        row = bench_size(n, args.profile, args.repeat, not args.no_http, args.seed)
+        report["results"][str(n)] = row
+        stages = " ".join(f"{k}={v:.1f}" for k, v in row["stages_ms"].items())
+        print(f"{n:>9} {row['total_ms']:>10.1f} {row.get('http_ms', float('nan')):>10.1f}  {stages}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+        print(f"Wrote {args.output}")
+    return 0
+
+
+def _timings(row: Dict[str, Any]) -> Dict[str, float]:
+    flat = {key: row[key] for key in ("total_ms", "http_ms") if key in row}
+    flat.update({f"stage:{name}": value for name, value in row.get("stages_ms", {}).items()})
+    return flat
+
+
+def cmd_compare(args: argparse.Namespace) -> int:
+    baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+    current = json.loads(Path(args.current).read_text(encoding="utf-8"))
+    if baseline["meta"].get("profile") != current["meta"].get("profile"):
+        print("warning: results come from different dataset profiles")
+
+    regressions = 0
+    print(f"{'messages':>9} {'metric':<20} {'baseline':>10} {'current':>10} {'change':>8}")
+    for size, base_row in baseline["results"].items():
+        row = current["results"].get(size)
+        if row is None:
+            continue
+        cur = _timings(row)
+        for metric, before in _timings(base_row).items():
+            if metric not in cur:
+                continue
+            after = cur[metric]
+            change = (after - before) / before if before else 0.0
+            regressed = change > args.tolerance and after - before > args.min_ms
+            regressions += regressed
+            flag = "  REGRESSION" if regressed else ""
+            print(f"{size:>9} {metric:<20} {before:>10.1f} {after:>10.1f} {change:>+7.1%}{flag}")
+    print(f"{regressions} regression(s) beyond {args.tolerance:.0%}")
+    return 1 if regressions else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="benchmark and optionally write a JSON baseline")
+    run.add_argument("--sizes", default="1000,10000,100000")
+    run.add_argument("--profile", choices=sorted(PROFILES), default="default")
+    run.add_argument("--repeat", type=int, default=3)
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--no-http", action="store_true", help="skip the HTTP path")
+    run.add_argument("--output")
+    run.set_defaults(func=cmd_run)
+
+    compare = sub.add_parser("compare", help="flag regressions against a baseline")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--tolerance", type=float, default=0.15, help="allowed slowdown, 0.15 = 15%%")
+    compare.add_argument("--min-ms", type=float, default=2.0, help="ignore differences below this")
+    compare.set_defaults(func=cmd_compare)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""Wall time of several worker processes with and without the shared cache.
+
+Usage: python benchmarks/bench_shared_cache.py [--workers 4] [--requests 8] [--messages 5000] [--pool 20000]
+
+Each worker process stands in for a uvicorn worker: it analyzes --requests
+feeds of --messages messages whose contents are drawn from a pool of --pool
+texts shared by all workers, larger than the per-process sentiment LRU, as
+when retweets and bots repeat the same texts across requests. Every worker
+starts with cold LRU caches. The "unique" row gives every message its own
+text, the worst case: every lookup misses and every result is written.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import sentiment_analyzer as sa  # noqa: E402
+from bench_parallel import WORDS, make_feed  # noqa: E402
+
+_cache = None
+
+
+def make_requests(worker: int, args, pool):
+    rng = random.Random(worker)
+    requests = []
+    for r in range(args.requests):
+        messages, now = make_feed(args.messages, args.seed + worker * args.requests + r)
+        for m in messages:
+            m["content"] = rng.choice(pool) if pool else " ".join(rng.choice(WORDS) for _ in range(12)) + f" {rng.random()}"
+        requests.append(messages)
+    return requests, now
+
+
+def init_worker(path, capacity) -> None:
+    global _cache
+    if path:
+        from shared_cache import SharedCache
+        _cache = SharedCache(path, capacity)
+    sa.set_shared_cache(_cache)
+
+
+def run_worker(job) -> float:
+    requests, now = job
+    t0 = time.perf_counter()
+    for messages in requests:
+        sa.analyze_feed(messages, 30, now)
+    if _cache is not None:
+        _cache.flush()
+    return time.perf_counter() - t0
+
+
+def timed(jobs, path, capacity) -> float:
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(len(jobs), initializer=init_worker, initargs=(path, capacity)) as pool:
+        t0 = time.perf_counter()
+        pool.map(run_worker, jobs, chunksize=1)
+        return time.perf_counter() - t0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=8)
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--pool", type=int, default=20000)
+    parser.add_argument("--capacity", type=int, default=1 << 18)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    pool = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 40)))[:280] for _ in range(args.pool)]
+
+    print(f"cpus: {os.cpu_count()}  workers: {args.workers}  requests/worker: {args.requests}  "
+          f"messages/request: {args.messages}  sentiment LRU: {sa.SENTIMENT_CACHE_SIZE}")
+    print(f"{'contents':>10} {'off ms':>9} {'on ms':>9} {'speedup':>8}")
+    for label, contents in ((f"pool {args.pool}", pool), ("unique", None)):
+        jobs = [make_requests(w, args, contents) for w in range(args.workers)]
+        off = timed(jobs, None, args.capacity)
+        with tempfile.TemporaryDirectory(dir="/dev/shm" if os.path.isdir("/dev/shm") else None) as tmp:
+            on = timed(jobs, os.path.join(tmp, "cache"), args.capacity)
+        print(f"{label:>10} {off * 1000:>9.1f} {on * 1000:>9.1f} {off / on:>8.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""Exact trending vs the Space-Saving sketch: memory and top-5 accuracy.
+
+Usage: python benchmarks/bench_trending.py [--occurrences 1000000] [--distinct 10000,100000,1000000] [--capacity 1024]
+
+Hashtags follow a Zipf-like distribution over `distinct` tags with random
+ages and sentiments. Memory is the tracemalloc peak of each aggregation.
+"""
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import sentiment_analyzer as sa  # noqa: E402
+
+
+def occurrences(n: int, distinct: int, seed: int):
+    # Materialized up front so generation cost and memory stay out of the measurements
+    rng = random.Random(seed)
+    weights = [1.0 / (rank + 1) ** 1.1 for rank in range(distinct)]
+    names = [f"#tag{t}" for t in range(distinct)]
+    stream = []
+    for t in rng.choices(range(distinct), weights=weights, k=n):
+        multiplier = rng.choice((1.2, 0.8, 1.0))
+        stream.append((names[t], sa._hashtag_weight(names[t], rng.randint(0, 1800) * 1_000_000, multiplier), multiplier))
+    return stream
+
+
+def exact(stream):
+    weights, counts, sentiment_weights = {}, {}, {}
+    for tag, w, m in stream:
+        weights[tag] = weights.get(tag, 0.0) + w
+        counts[tag] = counts.get(tag, 0) + 1
+        sentiment_weights[tag] = sentiment_weights.get(tag, 0.0) + m
+    tags = list(weights)
+    top = sa._top_tags(tags, [weights[t] for t in tags], [counts[t] for t in tags], [sentiment_weights[t] for t in tags])
+    return top, weights
+
+
+def sketched(stream, capacity):
+    sketch = sa.SpaceSavingTrending(capacity)
+    for tag, w, m in stream:
+        sketch.add(tag, w, m)
+    return sketch.top(5), sketch.error_bound()
+
+
+def measure(fn, *args):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    out = fn(*args)
+    elapsed = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return out, elapsed, peak / 1e6
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--occurrences", type=int, default=1_000_000)
+    parser.add_argument("--distinct", default="10000,100000,1000000")
+    parser.add_argument("--capacity", type=int, default=1024)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    print(f"{'distinct':>9} {'exact MB':>9} {'exact s':>8} {'sketch MB':>10} {'sketch s':>9} {'top5 hit':>9} {'max rel err':>12} {'bound':>8}")
+    for distinct in (int(x) for x in args.distinct.split(",")):
+        stream = occurrences(args.occurrences, distinct, args.seed)
+        (exact_top, weights), exact_s, exact_mb = measure(exact, stream)
+        (sketch_top, bound), sketch_s, sketch_mb = measure(sketched, stream, args.capacity)
+        hits = len(set(exact_top) & {t for t, _, _ in sketch_top})
+        rel_err = max(abs(w - weights[t]) / weights[t] for t, w, _ in sketch_top)
+        print(f"{distinct:>9} {exact_mb:>9.1f} {exact_s:>8.2f} {sketch_mb:>10.2f} {sketch_s:>9.2f} {hits:>7}/5 {rel_err:>12.2e} {bound:>8.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""Synthetic feeds for the benchmarks.
+
+`generate_feed(n, ...)` returns an /analyze-feed payload whose shape is
+controlled by a `FeedProfile`: Zipf-skewed users and hashtags, a share of long
+Unicode content (accents, emoji, combining marks) and adversarial anomaly
+patterns that sit right at the detection thresholds (10 vs 11 messages in five
+minutes, alternation broken on the last message, shuffled and equal
+timestamps). Same seed, same feed.
+"""
+import bisect
+import itertools
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+NOW = datetime(2025, 9, 10, 11, 0, 0, tzinfo=timezone.utc)
+
+LEXICON_WORDS = [
+    "bom", "ótimo", "adorei", "excelente", "maravilhoso", "perfeito", "gostei",
+    "ruim", "péssimo", "odiei", "terrível", "horrível", "decepcionante",
+    "muito", "super", "extremamente", "não", "nunca", "jamais",
+]
+FILLER_WORDS = [
+    "produto", "entrega", "atendimento", "preço", "qualidade", "hoje", "semana", "loja",
+    "aplicativo", "pedido", "suporte", "promoção", "cliente", "compra", "frete", "caixa",
+]
+UNICODE_WORDS = [
+    "ação", "coração", "açúcar", "pão", "você", "avó", "Ñandú", "naïve", "café", "ﬁm",
+    "😀", "🔥", "👍🏽", "é", "ão", "ＭＢＲＡＳ", "Straße", "İstanbul",
+]
+PUNCTUATION = ["", "", "", "!", "?", ".", "...", "!!", ","]
+
+
+@dataclass(frozen=True)
+class FeedProfile:
+    users: int = 0               # distinct users; 0 = n // 10
+    user_skew: float = 1.1       # Zipf exponent for user activity (0 = uniform)
+    hashtags: int = 500          # distinct hashtags
+    hashtag_skew: float = 1.2    # Zipf exponent for hashtag popularity
+    max_hashtags: int = 4        # per message
+    unicode_ratio: float = 0.3   # messages drawing non-ASCII words
+    long_ratio: float = 0.2      # messages padded close to the 280-character limit
+    anomaly_ratio: float = 0.01  # share of messages belonging to adversarial patterns
+    span_minutes: int = 120      # timestamps spread over [now - span, now]
+    shuffle: bool = True         # arrival order differs from chronological order
+
+
+SMALL_SPAN = FeedProfile(span_minutes=30)
+UNIFORM = FeedProfile(user_skew=0.0, hashtag_skew=0.0, unicode_ratio=0.0, long_ratio=0.0, anomaly_ratio=0.0)
+PROFILES = {"default": FeedProfile(), "uniform": UNIFORM, "small-span": SMALL_SPAN}
+
+
+def _zipf_cum_weights(n: int, skew: float) -> List[float]:
+    return list(itertools.accumulate(1.0 / (rank ** skew) for rank in range(1, n + 1)))
+
+
+def _timestamp(seconds_ago: int) -> str:
+    return (NOW - timedelta(seconds=seconds_ago)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _content(rng: random.Random, profile: FeedProfile) -> str:
+    pool = FILLER_WORDS + LEXICON_WORDS
+    if rng.random() < profile.unicode_ratio:
+        pool = pool + UNICODE_WORDS
+    words = [rng.choice(pool) + rng.choice(PUNCTUATION) for _ in range(rng.randint(3, 25))]
+    content = " ".join(words)
+    if rng.random() < profile.long_ratio:
+        while len(content) < 260:
+            content += " " + rng.choice(pool)
+    return content[:280]
+
+
+def _message(i: int, user: str, content: str, seconds_ago: int, hashtags: List[str], rng: random.Random) -> Dict[str, Any]:
+    return {
+        "id": f"bench_{i}",
+        "content": content,
+        "timestamp": _timestamp(seconds_ago),
+        "user_id": user,
+        "hashtags": hashtags,
+        "reactions": rng.randint(0, 50),
+        "shares": rng.randint(0, 10),
+        "views": rng.randint(0, 5000),
+    }
+
+
+def _adversarial(count: int, rng: random.Random, start: int) -> List[Dict[str, Any]]:
+    # Patterns right at the anomaly thresholds, so the detectors cannot take shortcuts
+    messages: List[Dict[str, Any]] = []
+    pattern = 0
+    while len(messages) < count:
+        user = f"user_adv_{pattern:05d}"
+        base = rng.randint(0, 3600)
+        kind = pattern % 4
+        if kind == 0:  # 11 messages in under 5 minutes: burst
+            offsets = [base + 25 * k for k in range(11)]
+            contents = ["bom dia"] * 11
+        elif kind == 1:  # 10 messages in 5 minutes: one short of a burst
+            offsets = [base + 30 * k for k in range(10)]
+            contents = ["bom dia"] * 10
+        elif kind == 2:  # alternating +/- broken on the last message
+            offsets = [base + 60 * k for k in range(10)]
+            contents = ["adorei", "odiei"] * 4 + ["adorei", "adorei"]
+        else:  # six messages in the same second, alternating
+            offsets = [base] * 6
+            contents = ["excelente", "terrível"] * 3
+        for offset, content in zip(offsets, contents):
+            messages.append(_message(start + len(messages), user, content, offset, [], rng))
+        pattern += 1
+    return messages[:count]
+
+
+def generate_feed(n: int, profile: FeedProfile = FeedProfile(), seed: int = 0, time_window_minutes: int = 30) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    n_users = profile.users or max(1, n // 10)
+    users = [f"user_{k:07d}" for k in range(n_users)]
+    user_weights = _zipf_cum_weights(n_users, profile.user_skew)
+    tags = [f"#tag{k}" for k in range(profile.hashtags)]
+    tag_weights = _zipf_cum_weights(profile.hashtags, profile.hashtag_skew)
+    span = profile.span_minutes * 60
+
+    n_adversarial = int(n * profile.anomaly_ratio)
+    n_regular = n - n_adversarial
+    picked_users = rng.choices(users, cum_weights=user_weights, k=n_regular)
+    messages = []
+    for i, user in enumerate(picked_users):
+        k = rng.randint(0, profile.max_hashtags)
+        hashtags = []
+        for _ in range(k):
+            tag = tags[bisect.bisect_left(tag_weights, rng.random() * tag_weights[-1])]
+            if tag not in hashtags:
+                hashtags.append(tag)
+        messages.append(_message(i, user, _content(rng, profile), rng.randint(0, span), hashtags, rng))
+    messages += _adversarial(n_adversarial, rng, n_regular)
+
+    if profile.shuffle:
+        rng.shuffle(messages)
+    else:
+        messages.sort(key=lambda m: m["timestamp"])
+    return {"messages": messages, "time_window_minutes": time_window_minutes}
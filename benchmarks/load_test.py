@@ -0,0 +1,252 @@
+"""Load generator and replay harness for /analyze-feed with latency percentiles.
+
+Usage:
+    python benchmarks/load_test.py [--input bodies.jsonl | --generate 1000] [--requests 500 | --duration 30]
+                                   [--concurrency 8] [--rate 50] [--workers 1] [--url http://host:port]
+                                   [--asgi] [--max-p99-ms 200] [--max-error-rate 0.01] [--output report.json]
+
+Request bodies come from --input (a .json body, or JSONL with one /analyze-feed body per
+line, replayed byte for byte; lines that decode to something without "messages" are
+skipped) or from examples/generate_performance_data.py (--generate N messages); several
+bodies are replayed round-robin. Unless --url is given, the
+app is started on a local uvicorn (--workers processes, server env inherited) and stopped
+at the end; --asgi drives the app in-process instead, without sockets.
+
+Closed loop by default: --concurrency clients send back to back. With --rate the arrivals
+are open-loop at that many requests per second (still at most --concurrency in flight), and
+latency is measured from the scheduled send time, so queueing on the client side is counted
+instead of hidden.
+
+Reports throughput, p50/p95/p99/max latency, error rate by status and the server-side
+processing_time_ms. Exits 1 when --max-p99-ms or --max-error-rate is exceeded.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import httpx  # noqa: E402
+
+
+def _message_count(payload: Any) -> int:
+    messages = payload.get("messages") if isinstance(payload, dict) else None
+    return len(messages) if isinstance(messages, list) else 0
+
+
+def load_bodies(path: Optional[str], generate: Optional[int]) -> List[Tuple[bytes, int]]:
+    # [(body, message count)]; JSONL lines are replayed byte for byte, invalid ones included
+    if generate is not None:
+        sys.path.insert(0, str(ROOT / "examples"))
+        from generate_performance_data import generate as generate_feed
+
+        payload = generate_feed(generate)
+        return [(json.dumps(payload, ensure_ascii=False).encode("utf-8"), len(payload["messages"]))]
+    data = Path(path).read_bytes()
+    if not path.endswith(".jsonl"):
+        return [(data, _message_count(json.loads(data)))]
+    bodies = []
+    for line in data.splitlines():
+        if not line.strip():
+            continue
+        try:
+            payload = json.loads(line)
+        except ValueError:
+            bodies.append((line, 0))
+            continue
+        if isinstance(payload, dict) and "messages" in payload:
+            bodies.append((line, _message_count(payload)))
+    if not bodies:
+        raise SystemExit("no /analyze-feed bodies found in the input")
+    return bodies
+
+
+def percentile(values: List[float], q: float) -> float:
+    # Nearest rank on sorted values
+    if not values:
+        return 0.0
+    rank = max(1, -(-len(values) * q // 100))
+    return values[int(rank) - 1]
+
+
+class Results:
+    def __init__(self) -> None:
+        self.latencies: List[float] = []
+        self.processing: List[float] = []
+        self.statuses: Counter = Counter()
+        self.messages = 0
+
+    def record(self, status: Any, latency: float, body: Optional[bytes], messages: int) -> None:
+        self.statuses[status] += 1
+        self.latencies.append(latency)
+        if status == 200:
+            self.messages += messages
+            try:
+                self.processing.append(json.loads(body)["analysis"]["processing_time_ms"])
+            except (ValueError, KeyError, TypeError):
+                pass
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        total = sum(self.statuses.values())
+        errors = total - self.statuses.get(200, 0)
+        latencies = sorted(x * 1000 for x in self.latencies)
+        processing = sorted(self.processing)
+        return {
+            "requests": total,
+            "elapsed_s": round(elapsed, 3),
+            "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+            "messages_per_s": round(self.messages / elapsed, 1) if elapsed else 0.0,
+            "error_rate": round(errors / total, 4) if total else 0.0,
+            "statuses": {str(k): v for k, v in sorted(self.statuses.items(), key=lambda kv: str(kv[0]))},
+            "latency_ms": {f"p{q}": round(percentile(latencies, q), 2) for q in (50, 95, 99)} | {"max": round(latencies[-1], 2) if latencies else 0.0},
+            "processing_time_ms": {f"p{q}": percentile(processing, q) for q in (50, 95, 99)} | {"max": processing[-1] if processing else 0},
+        }
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    bodies: List[Tuple[bytes, int]],
+    requests: Optional[int],
+    duration: Optional[float],
+    concurrency: int,
+    rate: Optional[float],
+) -> Tuple[Results, float]:
+    results = Results()
+    headers = {"Content-Type": "application/json"}
+    slots = asyncio.Semaphore(concurrency)
+    started = time.perf_counter()
+
+    async def one(i: int, scheduled: float) -> None:
+        body, messages = bodies[i % len(bodies)]
+        try:
+            resp = await client.post("/analyze-feed", content=body, headers=headers)
+            status, content = resp.status_code, resp.content
+        except httpx.HTTPError as e:
+            status, content = type(e).__name__, None
+        results.record(status, time.perf_counter() - scheduled, content, messages)
+        slots.release()
+
+    tasks = []
+    i = 0
+    while (requests is None or i < requests) and (duration is None or time.perf_counter() - started < duration):
+        scheduled = None
+        if rate:
+            scheduled = started + i / rate
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        await slots.acquire()
+        tasks.append(asyncio.ensure_future(one(i, scheduled if scheduled is not None else time.perf_counter())))
+        i += 1
+    await asyncio.gather(*tasks)
+    return results, time.perf_counter() - started
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers: int) -> Tuple[subprocess.Popen, str]:
+    port = _free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=ROOT,
+        env=os.environ.copy(),
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"uvicorn exited with status {proc.returncode}")
+        try:
+            if httpx.get(f"{url}/metrics", timeout=1).status_code == 200:
+                return proc, url
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise SystemExit("uvicorn did not become ready within 30s")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--input", help=".json body or .jsonl with one body per line")
+    source.add_argument("--generate", type=int, metavar="N", help="messages per generated body")
+    parser.add_argument("--requests", type=int, help="total requests (default 200 unless --duration)")
+    parser.add_argument("--duration", type=float, help="seconds to keep sending")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, help="open-loop arrivals per second")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--url", help="target an already running server")
+    parser.add_argument("--asgi", action="store_true", help="drive the app in-process (no uvicorn)")
+    parser.add_argument("--max-p99-ms", type=float)
+    parser.add_argument("--max-error-rate", type=float)
+    parser.add_argument("--output", help="write the report as JSON")
+    args = parser.parse_args()
+    if args.requests is None and args.duration is None:
+        args.requests = 200
+
+    bodies = load_bodies(args.input, args.generate)
+    proc = None
+    if args.asgi:
+        from main import app
+
+        transport, url = httpx.ASGITransport(app=app), "http://asgi"
+    else:
+        if args.url:
+            url = args.url.rstrip("/")
+        else:
+            proc, url = start_server(args.workers)
+        transport = httpx.AsyncHTTPTransport(limits=httpx.Limits(max_connections=args.concurrency))
+    try:
+        async def go() -> Tuple[Results, float]:
+            async with httpx.AsyncClient(transport=transport, base_url=url, timeout=60) as client:
+                return await run_load(client, bodies, args.requests, args.duration, args.concurrency, args.rate)
+
+        results, elapsed = asyncio.run(go())
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=10)
+
+    report = results.report(elapsed)
+    report["config"] = {
+        "bodies": len(bodies),
+        "messages_per_body": sorted({n for _, n in bodies}),
+        "concurrency": args.concurrency,
+        "rate": args.rate,
+        "workers": None if args.url or args.asgi else args.workers,
+        "target": "asgi" if args.asgi else url,
+    }
+    lat, proc_ms = report["latency_ms"], report["processing_time_ms"]
+    print(f"requests {report['requests']} in {report['elapsed_s']}s: {report['throughput_rps']} req/s, {report['messages_per_s']} msg/s")
+    print(f"latency ms   p50 {lat['p50']}  p95 {lat['p95']}  p99 {lat['p99']}  max {lat['max']}")
+    print(f"server ms    p50 {proc_ms['p50']}  p95 {proc_ms['p95']}  p99 {proc_ms['p99']}  max {proc_ms['max']}")
+    print(f"errors       {report['error_rate']:.2%}  statuses {report['statuses']}")
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+
+    failed = False
+    if args.max_p99_ms is not None and lat["p99"] > args.max_p99_ms:
+        print(f"p99 {lat['p99']}ms above {args.max_p99_ms}ms")
+        failed = True
+    if args.max_error_rate is not None and report["error_rate"] > args.max_error_rate:
+        print(f"error rate {report['error_rate']:.2%} above {args.max_error_rate:.2%}")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+"""Offline analysis of large JSONL files, memory-mapped and split across processes.
+
+Two layouts:
+    requests  one /analyze-feed request body per line ({"messages": [...], "time_window_minutes": N});
+              each line gets its own result, with the status the endpoint would answer
+    feed      one message per line (like /analyze-feed/stream); the whole file is one feed
+
+The file is memory-mapped and cut at line boundaries into chunks of about
+--chunk-mb. In requests mode every worker maps the file itself and analyzes
+whole chunks, so only the chunks in flight (two per worker) and their results
+are in memory, whatever the file size. In feed mode the lines are decoded here
+and scored in the scoring pool as they are read; the retained columns grow with
+the number of messages, not with the file size.
+
+Output is JSONL: in requests mode {"line": n, "status": ..., ...analysis or error/code},
+in feed mode one line with the analysis. Throughput and peak RSS go to stderr.
+
+Usage: python bulk_analyze.py input.jsonl output.jsonl [--mode requests|feed] [--workers N]
+                              [--window 30] [--reference-time 2025-09-10T11:00:00Z] [--chunk-mb 4]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import mmap
+import os
+import resource
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError as PydanticValidationError
+
+import fast_ingest
+import sentiment_analyzer
+from fast_ingest import AnalyzeFeedRequest, MessageModel
+from sentiment_analyzer import (
+    UNSUPPORTED_WINDOW_ERROR,
+    UNSUPPORTED_WINDOW_MINUTES,
+    ValidationError,
+    analyze_feed,
+    analyze_feed_stream,
+    analyze_with_windows,
+    parse_iso8601,
+)
+
+MB = 1024 * 1024
+
+
+def _loads(line: bytes) -> Any:
+    if fast_ingest.orjson is not None:
+        return fast_ingest.orjson.loads(line)
+    return json.loads(line)
+
+
+def _dumps(value: Any) -> bytes:
+    if fast_ingest.orjson is not None:
+        return fast_ingest.orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False).encode("utf-8")
+
+
+def chunk_bounds(mm: mmap.mmap, chunk_bytes: int) -> Iterator[Tuple[int, int]]:
+    # [start, end) ranges that end right after a newline (or at EOF)
+    size = len(mm)
+    start = 0
+    while start < size:
+        newline = mm.find(b"\n", min(start + chunk_bytes, size) - 1)
+        end = size if newline == -1 else newline + 1
+        yield start, end
+        start = end
+
+
+def _lines(mm: mmap.mmap, start: int, end: int) -> Iterator[bytes]:
+    while start < end:
+        newline = mm.find(b"\n", start, end)
+        stop = end if newline == -1 else newline + 1
+        yield mm[start:stop]
+        start = stop
+
+
+def _validation_error(e: Any) -> Dict[str, Any]:
+    # Same entry /analyze-feeds produces for a feed pydantic rejects
+    err = e.errors(include_url=False)[0]
+    location = ".".join(str(part) for part in err["loc"])
+    return {"status": 422, "error": f"{location}: {err['msg']}" if location else err["msg"], "code": "INVALID_INPUT"}
+
+
+def analyze_request(line: bytes, now_utc: datetime) -> Tuple[int, Dict[str, Any]]:
+    # (message count, result entry) for one request body, as /analyze-feed would answer it
+    parsed = fast_ingest.parse_feed(line)
+    if parsed is None:
+        try:
+            payload = AnalyzeFeedRequest.model_validate_json(line)
+        except PydanticValidationError as e:
+            return 0, _validation_error(e)
+        parsed = [m.model_dump() for m in payload.messages], payload.time_window_minutes, payload.reference_time, payload.time_windows_minutes
+    messages, time_window_minutes, reference_time, time_windows_minutes = parsed
+    if time_window_minutes == UNSUPPORTED_WINDOW_MINUTES:
+        return len(messages), {"status": 422, **UNSUPPORTED_WINDOW_ERROR}
+    started = time.perf_counter()
+    try:
+        if reference_time is not None:
+            now_utc = parse_iso8601(reference_time)
+        if time_windows_minutes is None:
+            result = analyze_feed(messages, time_window_minutes, now_utc)
+        else:
+            result = analyze_with_windows(messages, time_window_minutes, time_windows_minutes, now_utc)
+    except ValidationError as e:
+        return len(messages), {"status": 400, "error": str(e), "code": e.code}
+    result["analysis"]["processing_time_ms"] = int((time.perf_counter() - started) * 1000)
+    return len(messages), {"status": 200, **result}
+
+
+def _analyze_chunk(path: str, start: int, end: int, now_utc: datetime) -> Tuple[int, int, List[Tuple[int, bytes]]]:
+    # Runs in a worker: (lines, messages, [(line index within the chunk, encoded entry)])
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        lines = 0
+        messages = 0
+        out = []
+        for line in _lines(mm, start, end):
+            if line.strip():
+                count, entry = analyze_request(line, now_utc)
+                messages += count
+                out.append((lines, _dumps(entry)))
+            lines += 1
+    return lines, messages, out
+
+
+def run_requests(path: str, out, workers: int, chunk_bytes: int, now_utc: datetime) -> int:
+    bounds = []
+    if os.path.getsize(path):  # mmap refuses empty files
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            bounds = list(chunk_bounds(mm, chunk_bytes))
+    total = 0
+    line_base = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight: deque = deque()
+        pending = iter(bounds)
+
+        def submit_next() -> bool:
+            bound = next(pending, None)
+            if bound is None:
+                return False
+            in_flight.append(pool.submit(_analyze_chunk, path, bound[0], bound[1], now_utc))
+            return True
+
+        while len(in_flight) < 2 * workers and submit_next():
+            pass
+        while in_flight:
+            lines, messages, entries = in_flight.popleft().result()
+            submit_next()
+            for index, entry in entries:
+                out.write(b'{"line":%d,' % (line_base + index + 1) + entry[1:] + b"\n")
+            line_base += lines
+            total += messages
+    return total
+
+
+def _feed_messages(path: str) -> Iterator[Dict[str, Any]]:
+    # Same acceptance as /analyze-feed/stream: exact types go straight through, anything
+    # else through MessageModel (coercions, 422-style errors)
+    if not os.path.getsize(path):
+        return
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for line_no, line in enumerate(_lines(mm, 0, len(mm)), 1):
+            if not line.strip():
+                continue
+            try:
+                m = _loads(line)
+            except ValueError:
+                m = None
+            if not fast_ingest._is_canonical(m):
+                try:
+                    m = MessageModel.model_validate_json(line).model_dump()
+                except ValueError as e:
+                    raise SystemExit(f"{path}:{line_no}: {e}")
+            yield m
+
+
+def run_feed(path: str, out, workers: int, time_window_minutes: int, now_utc: datetime) -> int:
+    counted = 0
+
+    def counting(messages: Iterator[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        nonlocal counted
+        for m in messages:
+            counted += 1
+            yield m
+
+    if time_window_minutes == UNSUPPORTED_WINDOW_MINUTES:
+        out.write(_dumps({"status": 422, **UNSUPPORTED_WINDOW_ERROR}) + b"\n")
+        return 0
+    if workers > 1:
+        sentiment_analyzer.start_scoring_pool(workers)
+    try:
+        started = time.perf_counter()
+        try:
+            result = analyze_feed_stream(counting(_feed_messages(path)), time_window_minutes, now_utc)
+        except ValidationError as e:
+            out.write(_dumps({"status": 400, "error": str(e), "code": e.code}) + b"\n")
+            return counted
+        result["analysis"]["processing_time_ms"] = int((time.perf_counter() - started) * 1000)
+        out.write(_dumps({"status": 200, **result}) + b"\n")
+    finally:
+        sentiment_analyzer.stop_scoring_pool()
+    return counted
+
+
+def _peak_rss_mb(who: int) -> float:
+    return resource.getrusage(who).ru_maxrss / 1024  # KiB on Linux
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input")
+    parser.add_argument("output")
+    parser.add_argument("--mode", choices=("requests", "feed"), default="requests")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--window", type=int, default=30, help="time_window_minutes in feed mode")
+    parser.add_argument("--reference-time", help="RFC3339 instant of the analysis (default: now)")
+    parser.add_argument("--chunk-mb", type=float, default=4.0)
+    args = parser.parse_args(argv)
+
+    now_utc = parse_iso8601(args.reference_time) if args.reference_time else datetime.now(timezone.utc)
+    started = time.perf_counter()
+    with open(args.output, "wb") as out:
+        if args.mode == "requests":
+            messages = run_requests(args.input, out, max(1, args.workers), int(args.chunk_mb * MB), now_utc)
+        else:
+            messages = run_feed(args.input, out, args.workers, args.window, now_utc)
+    elapsed = time.perf_counter() - started
+    rate = messages / elapsed if elapsed > 0 else 0.0
+    print(
+        f"{messages} messages in {elapsed:.2f}s ({rate:,.0f} msg/s); peak RSS "
+        f"{_peak_rss_mb(resource.RUSAGE_SELF):.1f} MB main, {_peak_rss_mb(resource.RUSAGE_CHILDREN):.1f} MB largest worker",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
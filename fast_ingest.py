@@ -0,0 +1,96 @@
+"""Single-validation ingestion of /analyze-feed request bodies.
+
+The regular path validates every message twice: pydantic builds a MessageModel,
+`model_dump()` turns it back into a dict and the analyzer validates it again.
+`parse_feed` decodes the raw body with orjson and accepts it only when pydantic
+would take it unchanged: every field already has its exact type (no bool->int,
+"5"->5 or 5.0->5 coercions, no missing required field). Such messages go
+straight to the analyzer, whose checks produce the same 400 codes as before.
+Anything else returns None and is served by the pydantic route, so its 422
+responses are untouched. The request models of that route live here too, so
+that bulk_analyze.py validates lines the same way without importing the app.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+try:  # Required (requirements.txt); if it is missing anyway, every request takes the pydantic route
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+class MessageModel(BaseModel):
+    id: str
+    content: str
+    timestamp: str
+    user_id: str
+    hashtags: List[str] = Field(default_factory=list)
+    reactions: int = 0
+    shares: int = 0
+    views: int = 0
+
+
+class AnalyzeFeedRequest(BaseModel):
+    messages: List[MessageModel]
+    time_window_minutes: int
+    # Instant the analysis is computed at (RFC3339 UTC); defaults to the server clock
+    reference_time: Optional[str] = None
+    # Extra windows answered from the same pass (dashboards: 5, 15, 60, 240)
+    time_windows_minutes: Optional[List[int]] = None
+
+
+_REQUIRED_STR_FIELDS = ("id", "content", "timestamp", "user_id")
+_COUNT_FIELDS = ("reactions", "shares", "views")
+
+
+def _is_canonical(m: Any) -> bool:
+    # True when MessageModel(**m).model_dump() would hold the same values the analyzer reads
+    if type(m) is not dict:
+        return False
+    for field in _REQUIRED_STR_FIELDS:
+        if type(m.get(field)) is not str:
+            return False
+    if "hashtags" in m:
+        hashtags = m["hashtags"]
+        if type(hashtags) is not list:
+            return False
+        for h in hashtags:
+            if type(h) is not str:
+                return False
+    for field in _COUNT_FIELDS:
+        if type(m.get(field, 0)) is not int:
+            return False
+    return True
+
+
+def parse_feed(body: bytes) -> Optional[Tuple[List[Dict[str, Any]], int, Optional[str], Optional[List[int]]]]:
+    # (messages, time_window_minutes, reference_time, time_windows_minutes), or None when the pydantic route must handle the body
+    if orjson is None:
+        return None
+    try:
+        data = orjson.loads(body)
+    except orjson.JSONDecodeError:
+        return None
+    if type(data) is not dict:
+        return None
+    messages = data.get("messages")
+    time_window_minutes = data.get("time_window_minutes")
+    if type(messages) is not list or type(time_window_minutes) is not int:
+        return None
+    reference_time = data.get("reference_time")
+    if reference_time is not None and type(reference_time) is not str:
+        return None
+    time_windows_minutes = data.get("time_windows_minutes")
+    if time_windows_minutes is not None:
+        if type(time_windows_minutes) is not list:
+            return None
+        for w in time_windows_minutes:
+            if type(w) is not int:
+                return None
+    for m in messages:
+        if not _is_canonical(m):
+            return None
+    return messages, time_window_minutes, reference_time, time_windows_minutes
@@ -1,72 +1,551 @@
-from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
-from datetime import datetime, timezone
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+from pydantic import BaseModel, Field, ValidationError as PydanticValidationError
+from typing import List, Optional, Dict, Any, AsyncIterator, Tuple
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone, timedelta
+import asyncio
+import os
+import threading
 import time
+import uuid
 
-from sentiment_analyzer import analyze_feed, ValidationError as AnalyzerValidationError
+import fast_ingest
+import metrics
+import offload
+import profiling
+import result_cache
 
+from fast_ingest import AnalyzeFeedRequest, MessageModel
+from sentiment_analyzer import (
+    UNSUPPORTED_WINDOW_ERROR,
+    UNSUPPORTED_WINDOW_MINUTES,
+    analyze_feed,
+    analyze_feeds,
+    analyze_with_windows,
+    answered_windows,
+    FeedAccumulator,
+    IncrementalAnalyzer,
+    Lexicon,
+    parse_iso8601,
+    set_followers_table,
+    set_lexicon,
+    set_shared_cache,
+    scoring_pool_workers,
+    start_scoring_pool,
+    stop_scoring_pool,
+    ValidationError as AnalyzerValidationError,
+    with_window_entries,
+)
 
-class MessageModel(BaseModel):
-    id: str
-    content: str
-    timestamp: str
-    user_id: str
-    hashtags: List[str] = Field(default_factory=list)
-    reactions: int = 0
-    shares: int = 0
-    views: int = 0
 
+class AnalyzeFeedsRequest(BaseModel):
+    # Validated one by one so that a malformed feed only fails its own entry
+    feeds: List[Any]
 
-class AnalyzeFeedRequest(BaseModel):
-    messages: List[MessageModel]
+
+class AnalyzeFeedSessionRequest(BaseModel):
+    session_id: Optional[str] = None
+    messages: List[MessageModel] = Field(default_factory=list)
     time_window_minutes: int
 
 
-app = FastAPI(title="MBRAS — Backend Challenge")
+class FastJSONResponse(JSONResponse):
+    # orjson encodes several times faster than the stdlib encoder behind JSONResponse
+    def render(self, content: Any) -> bytes:
+        if fast_ingest.orjson is None:
+            return super().render(content)
+        return fast_ingest.orjson.dumps(content)
 
+# Opt-in profiling: X-Profile-Key must be one of these; reports go to PROFILE_DIR when set,
+# otherwise they are attached to the response under "profile"
+PROFILE_KEYS = profiling.allowed_keys(os.getenv("PROFILE_KEYS"))
+PROFILE_DIR = os.getenv("PROFILE_DIR")
 
-@app.post("/analyze-feed")
-async def analyze_feed_endpoint(req: Request, payload: AnalyzeFeedRequest):
+# /analyze-feed results for requests with a fixed reference instant (reference_time) and, when
+# RESULT_CACHE_BUCKET_SECONDS is set, for the other requests within the same time bucket
+RESULT_CACHE = result_cache.ResultCache(
+    int(os.getenv("RESULT_CACHE_SIZE", "256")),
+    float(os.getenv("RESULT_CACHE_TTL_SECONDS", "300")),
+    int(os.getenv("RESULT_CACHE_BUCKET_SECONDS", "0")),
+)
+
+# CPU-bound analysis runs off the event loop: ANALYSIS_WORKERS threads, and up to
+# ANALYSIS_QUEUE_DEPTH more requests waiting for one before new ones get 503
+ANALYSIS_EXECUTOR = offload.BoundedExecutor(
+    int(os.getenv("ANALYSIS_WORKERS", "4")),
+    int(os.getenv("ANALYSIS_QUEUE_DEPTH", "64")),
+)
+# /analyze-feed/stream hands the executor this many NDJSON lines at a time
+STREAM_BATCH_LINES = 1000
+
+# Incremental sessions: idle ones expire, and the least recently used go first when full.
+# The lock serializes calls on one session across executor threads.
+SESSION_MAX = 1024
+SESSION_TTL_SECONDS = 900
+_sessions: "OrderedDict[str, Tuple[float, IncrementalAnalyzer, threading.Lock]]" = OrderedDict()
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    # Optional precomputed follower counts for the known user population
+    table = None
+    if os.getenv("FOLLOWERS_TABLE"):
+        from followers_table import FollowersTable
+
+        table = FollowersTable(os.environ["FOLLOWERS_TABLE"])
+        set_followers_table(table)
+    # Optional cache shared by every worker process on the host
+    shared = None
+    if os.getenv("SHARED_CACHE_PATH"):
+        from shared_cache import SharedCache
+
+        shared = SharedCache(os.environ["SHARED_CACHE_PATH"], int(os.getenv("SHARED_CACHE_SLOTS", str(1 << 18))))
+        set_shared_cache(shared)
+    # Optional lexicon file replacing the built-in word lists
+    if os.getenv("LEXICON_FILE"):
+        set_lexicon(Lexicon.from_file(os.environ["LEXICON_FILE"]))
+    # Per-stage latency histograms served at /metrics
+    if os.getenv("METRICS_ENABLED", "").lower() in ("1", "true", "yes"):
+        metrics.enable()
+    # Optional worker pool for sentiment scoring of large feeds
+    workers = int(os.getenv("SCORING_WORKERS", "0"))
+    if workers > 1:
+        start_scoring_pool(workers)
+    yield
+    stop_scoring_pool()
+    profiling.stop_tracer()
+    metrics.disable()
+    set_lexicon(None)
+    if table is not None:
+        set_followers_table(None)
+        table.close()
+    if shared is not None:
+        set_shared_cache(None)
+        shared.close()
+
+
+app = FastAPI(title="MBRAS — Backend Challenge", lifespan=lifespan)
+
+
+def _error_response(status_code: int, error: str, code: str) -> Response:
+    # Same body http_exception_handler produces for an HTTPException
+    return FastJSONResponse(status_code=status_code, content={"error": error, "code": code})
+
+
+def _unsupported_window() -> Response:
+    return _error_response(422, **UNSUPPORTED_WINDOW_ERROR)
+
+
+def _require_content_type(req: Request, media_type: str) -> None:
     # Basic content-type check → 400
-    content_type = req.headers.get("content-type", "").lower()
-    if "application/json" not in content_type:
+    if media_type not in req.headers.get("content-type", "").lower():
         raise HTTPException(status_code=400, detail={
-            "error": "Content-Type inválido. Use application/json",
+            "error": f"Content-Type inválido. Use {media_type}",
             "code": "INVALID_CONTENT_TYPE",
         })
 
-    # Business rule 422 for time_window_minutes == 123
-    if payload.time_window_minutes == 123:
-        return JSONResponse(status_code=422, content={
-            "error": "Valor de janela temporal não suportado na versão atual",
-            "code": "UNSUPPORTED_TIME_WINDOW",
+
+def _busy_response() -> Response:
+    response = _error_response(503, "Servidor ocupado; tente novamente em instantes", "SERVER_BUSY")
+    response.headers["Retry-After"] = "1"
+    return response
+
+
+async def _offload(fn, *args) -> Tuple[Any, str]:
+    # Raises offload.QueueFull when the executor is saturated. Returns fn's result and a
+    # Server-Timing value with the queue wait and the execution time in milliseconds.
+    result, queue_wait, execution = await ANALYSIS_EXECUTOR.run(fn, *args)
+    metrics.dispatch(queue_wait, execution)
+    return result, _server_timing(queue_wait, execution)
+
+
+async def _offload_all(fn, calls: List[Tuple[Any, ...]]) -> Tuple[List[Any], str]:
+    # _offload for several calls at once, each on its own executor thread; Server-Timing
+    # reports the longest wait and the longest run
+    runs = await asyncio.gather(*(ANALYSIS_EXECUTOR.run(fn, *args) for args in calls))
+    for _, queue_wait, execution in runs:
+        metrics.dispatch(queue_wait, execution)
+    timing = _server_timing(max(run[1] for run in runs), max(run[2] for run in runs))
+    return [run[0] for run in runs], timing
+
+
+def _server_timing(queue_wait: float, execution: float) -> str:
+    return f"queue;dur={queue_wait * 1000:.3f}, analysis;dur={execution * 1000:.3f}"
+
+
+def _analyze_feed_response(
+    messages: List[Dict[str, Any]],
+    time_window_minutes: int,
+    profile_key: Optional[str],
+    reference_time: Optional[str] = None,
+    time_windows_minutes: Optional[List[int]] = None,
+) -> Response:
+    # Shared by the route and the fast ingestion path: messages are plain dicts already
+    # shaped like MessageModel.model_dump()
+    if time_window_minutes == UNSUPPORTED_WINDOW_MINUTES:
+        return _unsupported_window()
+
+    if profile_key is not None and profile_key not in PROFILE_KEYS:
+        return _error_response(403, "Chave de profiling não autorizada", "PROFILING_NOT_ALLOWED")
+
+    started = time.perf_counter()
+    cache_instant = None
+    if reference_time is not None:
+        try:
+            now_utc = parse_iso8601(reference_time)
+        except AnalyzerValidationError as e:
+            return _error_response(400, str(e), e.code)
+        cache_instant = now_utc
+    else:
+        now_utc = datetime.now(timezone.utc)
+        if RESULT_CACHE.bucket_seconds > 0:
+            # The bucket only picks the cache entry; the analysis is anchored at the real clock
+            cache_instant = RESULT_CACHE.bucket_start(now_utc)
+
+    cache_key = None
+    if profile_key is None and RESULT_CACHE.enabled and cache_instant is not None:
+        cache_key = RESULT_CACHE.key(messages, time_window_minutes, cache_instant, time_windows_minutes, bucketed=reference_time is None)
+        cached = RESULT_CACHE.get(cache_key)
+        if cached is not None:
+            # Copy the top two levels: only processing_time_ms differs from the stored result
+            result = {**cached, "analysis": dict(cached["analysis"])}
+            result["analysis"]["processing_time_ms"] = int((time.perf_counter() - started) * 1000)
+            return FastJSONResponse(status_code=200, content=result)
+
+    report = None
+    try:
+        if profile_key is not None:
+            result, report = profiling.profile_analyze_feed(messages, time_window_minutes, now_utc)
+            if time_windows_minutes is not None:
+                # The profile covers the main window; the extra ones take a separate, unprofiled pass
+                result["windows"] = analyze_with_windows(messages, time_window_minutes, time_windows_minutes, now_utc)["windows"]
+        elif time_windows_minutes is not None:
+            result = analyze_with_windows(messages, time_window_minutes, time_windows_minutes, now_utc)
+        else:
+            result = analyze_feed(messages, time_window_minutes, now_utc)
+    except AnalyzerValidationError as e:
+        return _error_response(400, str(e), e.code)
+
+    elapsed_ms = int((time.perf_counter() - started) * 1000)
+    result["analysis"]["processing_time_ms"] = elapsed_ms
+    if cache_key is not None:
+        RESULT_CACHE.put(cache_key, result)
+    headers = None
+    if report is not None:
+        if PROFILE_DIR:
+            headers = {"X-Profile-Report": profiling.write_report(report, PROFILE_DIR)}
+        else:
+            result["profile"] = report
+    return FastJSONResponse(status_code=200, content=result, headers=headers)
+
+
+@app.post("/analyze-feed")
+async def analyze_feed_endpoint(req: Request, payload: AnalyzeFeedRequest):
+    _require_content_type(req, "application/json")
+
+    def run() -> Response:
+        return _analyze_feed_response(
+            [m.model_dump() for m in payload.messages],
+            payload.time_window_minutes,
+            req.headers.get("x-profile-key"),
+            payload.reference_time,
+            payload.time_windows_minutes,
+        )
+
+    response, timing = await _offload(run)
+    response.headers["Server-Timing"] = timing
+    return response
+
+
+def _fast_analyze_feed(body: bytes) -> Optional[Response]:
+    # None when the body must go through the pydantic route
+    parsed = fast_ingest.parse_feed(body)
+    if parsed is None:
+        return None
+    messages, time_window_minutes, reference_time, time_windows_minutes = parsed
+    return _analyze_feed_response(messages, time_window_minutes, None, reference_time, time_windows_minutes)
+
+
+class FastIngestMiddleware:
+    """Answers POST /analyze-feed without the pydantic round trip when it can.
+
+    The body is decoded once with orjson; if `fast_ingest.parse_feed` finds it
+    exactly as the route would receive it (application/json, every field of the
+    right type), the messages go straight to `_analyze_feed_response`. Decoding and
+    analysis both run on the analysis executor. Any other
+    request, and profiling requests, reach the route with the body replayed, so
+    422 validation errors and everything else stay as they were.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] != "/analyze-feed" or fast_ingest.orjson is None:
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        # FastAPI only decodes JSON for a json media type; mirror that, not just the substring check
+        media_type = headers.get(b"content-type", b"").split(b";")[0].strip().lower()
+        if media_type != b"application/json" or b"x-profile-key" in headers:
+            await self.app(scope, receive, send)
+            return
+
+        chunks = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            more_body = message.get("more_body", False)
+        body = b"".join(chunks)
+
+        try:
+            response, timing = await _offload(_fast_analyze_feed, body)
+        except offload.QueueFull:
+            await _busy_response()(scope, receive, send)
+            return
+        if response is None:
+            replayed = False
+
+            async def replay():
+                nonlocal replayed
+                if replayed:
+                    return await receive()
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+
+            await self.app(scope, replay, send)
+            return
+        response.headers["Server-Timing"] = timing
+        await response(scope, receive, send)
+
+
+app.add_middleware(FastIngestMiddleware)
+
+
+def _feed_error(status: int, error: str, code: str) -> Dict[str, Any]:
+    return {"status": status, "error": error, "code": code}
+
+
+@app.post("/analyze-feeds")
+async def analyze_feeds_endpoint(req: Request, payload: AnalyzeFeedsRequest):
+    # Independent feeds in one call. Each entry of "results" carries the status /analyze-feed
+    # would have answered with, plus either the analysis or the {error, code} body.
+    _require_content_type(req, "application/json")
+
+    now_utc = datetime.now(timezone.utc)
+    results: List[Optional[Dict[str, Any]]] = [None] * len(payload.feeds)
+    jobs = []
+    positions = []
+    windows: List[Optional[List[int]]] = []
+    for i, raw in enumerate(payload.feeds):
+        try:
+            feed = AnalyzeFeedRequest.model_validate(raw)
+        except PydanticValidationError as e:
+            err = e.errors(include_url=False)[0]
+            location = ".".join(str(part) for part in err["loc"])
+            results[i] = _feed_error(422, f"{location}: {err['msg']}" if location else err["msg"], "INVALID_INPUT")
+            continue
+        if feed.time_window_minutes == UNSUPPORTED_WINDOW_MINUTES:
+            results[i] = {"status": 422, **UNSUPPORTED_WINDOW_ERROR}
+            continue
+        feed_now = now_utc
+        if feed.reference_time is not None:
+            try:
+                feed_now = parse_iso8601(feed.reference_time)
+            except AnalyzerValidationError as e:
+                results[i] = _feed_error(400, str(e), e.code)
+                continue
+        job = ([m.model_dump() for m in feed.messages], feed.time_window_minutes, feed_now)
+        if feed.time_windows_minutes is not None:
+            job += (answered_windows(feed.time_windows_minutes),)
+        jobs.append(job)
+        positions.append(i)
+        windows.append(feed.time_windows_minutes)
+
+    workers = min(len(jobs), ANALYSIS_EXECUTOR.workers)
+    if scoring_pool_workers() or workers < 2:
+        # The scoring pool's processes take the feeds from a single executor thread
+        outcomes, timing = await _offload(analyze_feeds, jobs)
+    else:
+        # No process pool: one contiguous slice of feeds per executor thread
+        size = -(-len(jobs) // workers)
+        slices = [(jobs[start:start + size],) for start in range(0, len(jobs), size)]
+        parts, timing = await _offload_all(analyze_feeds, slices)
+        outcomes = [outcome for part in parts for outcome in part]
+    for i, job, feed_windows, (result, error) in zip(positions, jobs, windows, outcomes):
+        if error is not None:
+            results[i] = _feed_error(400, *error)
+            continue
+        if feed_windows is not None:
+            result = with_window_entries(result, job[1], feed_windows)
+        results[i] = {"status": 200, **result}
+    return FastJSONResponse(status_code=200, content={"results": results}, headers={"Server-Timing": timing})
+
+
+def _session_for(session_id: Optional[str], time_window_minutes: int) -> Tuple[str, IncrementalAnalyzer, threading.Lock]:
+    now = time.monotonic()
+    while _sessions:
+        oldest_id, (last_used, _, _) = next(iter(_sessions.items()))
+        if now - last_used <= SESSION_TTL_SECONDS:
+            break
+        del _sessions[oldest_id]
+
+    if session_id is None:
+        session_id = uuid.uuid4().hex
+        analyzer = IncrementalAnalyzer(time_window_minutes)
+        lock = threading.Lock()
+        while len(_sessions) >= SESSION_MAX:
+            _sessions.popitem(last=False)
+    elif session_id in _sessions:
+        _, analyzer, lock = _sessions[session_id]
+        if analyzer.time_window_minutes != time_window_minutes:
+            raise HTTPException(status_code=422, detail={
+                "error": "time_window_minutes difere do usado na criação da sessão",
+                "code": "SESSION_WINDOW_MISMATCH",
+            })
+    else:
+        raise HTTPException(status_code=404, detail={
+            "error": "Sessão desconhecida ou expirada; reenvie a janela completa sem session_id",
+            "code": "SESSION_NOT_FOUND",
         })
+    _sessions[session_id] = (now, analyzer, lock)
+    _sessions.move_to_end(session_id)
+    return session_id, analyzer, lock
+
+
+@app.post("/analyze-feed/session")
+async def analyze_feed_session_endpoint(req: Request, payload: AnalyzeFeedSessionRequest):
+    # First call (no session_id) sends the full window; later calls send only new messages
+    _require_content_type(req, "application/json")
+
+    if payload.time_window_minutes == UNSUPPORTED_WINDOW_MINUTES:
+        return _unsupported_window()
+
+    started = time.perf_counter()
+    try:
+        session_id, analyzer, lock = _session_for(payload.session_id, payload.time_window_minutes)
+    except AnalyzerValidationError as e:
+        raise HTTPException(status_code=400, detail={"error": str(e), "code": e.code})
+
+    def run() -> Dict[str, Any]:
+        messages = [m.model_dump() for m in payload.messages]
+        with lock:
+            # The clock is read under the lock so that snapshots of a session never go back in time
+            now_utc = datetime.now(timezone.utc)
+            analyzer.add(messages)
+            analyzer.evict_before(now_utc - timedelta(minutes=payload.time_window_minutes))
+            return analyzer.snapshot(now_utc)
+
+    try:
+        result, timing = await _offload(run)
+    except AnalyzerValidationError as e:
+        raise HTTPException(status_code=400, detail={"error": str(e), "code": e.code})
+
+    elapsed_ms = int((time.perf_counter() - started) * 1000)
+    result["analysis"]["processing_time_ms"] = elapsed_ms
+    result["session_id"] = session_id
+    return FastJSONResponse(status_code=200, content=result, headers={"Server-Timing": timing})
+
+
+async def _ndjson_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    # Re-split the body stream at newlines; a line may span several chunks, which are
+    # kept apart and joined once its newline arrives (appending to bytes is quadratic)
+    pending: List[bytes] = []
+    async for chunk in chunks:
+        if b"\n" not in chunk:
+            pending.append(chunk)
+            continue
+        first, *lines, rest = chunk.split(b"\n")
+        pending.append(first)
+        lines.insert(0, b"".join(pending))
+        pending = [rest]
+        for line in lines:
+            if line.strip():
+                yield line
+    line = b"".join(pending)
+    if line.strip():
+        yield line
+
+
+@app.post("/analyze-feed/stream")
+async def analyze_feed_stream_endpoint(
+    req: Request,
+    time_window_minutes: int,
+    trending_capacity: Optional[int] = Query(default=None, ge=5),
+):
+    # One MessageModel per line (application/x-ndjson); window comes from the query string.
+    # trending_capacity switches hashtags to a bounded Space-Saving sketch.
+    _require_content_type(req, "application/x-ndjson")
+
+    if time_window_minutes == UNSUPPORTED_WINDOW_MINUTES:
+        return _unsupported_window()
 
     started = time.perf_counter()
     now_utc = datetime.now(timezone.utc)
+    # Lines are read here; each batch is validated and folded on the executor, one at a time
+    timings = [0.0, 0.0]  # queue wait, execution
+
+    async def offloaded(fn, *args):
+        result, queue_wait, execution = await ANALYSIS_EXECUTOR.run(fn, *args)
+        timings[0] += queue_wait
+        timings[1] += execution
+        return result
+
+    def ingest(acc: FeedAccumulator, lines: List[bytes], first_line_no: int) -> None:
+        for line_no, line in enumerate(lines, first_line_no):
+            try:
+                message = MessageModel.model_validate_json(line)
+            except PydanticValidationError as e:
+                raise RequestValidationError(
+                    [{**err, "loc": ("body", line_no) + tuple(err["loc"])} for err in e.errors(include_url=False)]
+                )
+            acc.add(message.model_dump())
 
     try:
-        result = analyze_feed(
-            messages=[m.model_dump() for m in payload.messages],
-            time_window_minutes=payload.time_window_minutes,
-            now_utc=now_utc,
-        )
+        acc = FeedAccumulator(time_window_minutes, now_utc, trending_capacity)
+        line_no = 0
+        batch: List[bytes] = []
+        async for line in _ndjson_lines(req.stream()):
+            batch.append(line)
+            if len(batch) == STREAM_BATCH_LINES:
+                await offloaded(ingest, acc, batch, line_no)
+                line_no += len(batch)
+                batch = []
+        if batch:
+            await offloaded(ingest, acc, batch, line_no)
+        result = await offloaded(acc.result)
     except AnalyzerValidationError as e:
         raise HTTPException(status_code=400, detail={"error": str(e), "code": e.code})
 
+    metrics.dispatch(*timings)
     elapsed_ms = int((time.perf_counter() - started) * 1000)
     result["analysis"]["processing_time_ms"] = elapsed_ms
-    return JSONResponse(status_code=200, content=result)
+    return FastJSONResponse(status_code=200, content=result, headers={"Server-Timing": _server_timing(*timings)})
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    # Prometheus text exposition format; histograms stay empty unless METRICS_ENABLED is set
+    return PlainTextResponse(metrics.render() + RESULT_CACHE.render_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.exception_handler(offload.QueueFull)
+async def queue_full_handler(_, exc: offload.QueueFull):
+    return _busy_response()
 
 
 @app.exception_handler(HTTPException)
 async def http_exception_handler(_, exc: HTTPException):
     # Ensure error format matches the spec
     if isinstance(exc.detail, dict) and "error" in exc.detail and "code" in exc.detail:
-        return JSONResponse(status_code=exc.status_code, content=exc.detail)
-    return JSONResponse(status_code=exc.status_code, content={
+        return FastJSONResponse(status_code=exc.status_code, content=exc.detail)
+    return FastJSONResponse(status_code=exc.status_code, content={
         "error": str(exc.detail) if exc.detail else "Erro",
         "code": "ERROR",
     })
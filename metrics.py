@@ -0,0 +1,133 @@
+"""In-process histograms of analysis stage latencies and feed sizes.
+
+`enable()` installs a `Metrics` recorder in sentiment_analyzer; until then the
+analyzer takes no timings at all. `render()` produces the Prometheus text
+exposition format served at GET /metrics. Values are per process: with several
+uvicorn workers each one reports its own, and feeds analyzed inside the scoring
+pool workers (/analyze-feeds with SCORING_WORKERS) are not recorded.
+"""
+from __future__ import annotations
+
+import bisect
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import sentiment_analyzer
+
+STAGES = ("validation", "sentiment", "aggregation", "influence", "trending", "anomalies")
+DISPATCH_PHASES = ("queue_wait", "execution")
+STAGE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MESSAGE_BUCKETS = (0, 1, 10, 50, 100, 500, 1000, 5000, 10000, 50000, 100000, 500000, 1000000)
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Sequence[float]) -> None:
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        # Prometheus buckets are upper-inclusive (le)
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        out = []
+        total = 0
+        for bound, n in zip(self.bounds + (float("inf"),), self.counts):
+            total += n
+            out.append(("+Inf" if bound == float("inf") else _fmt(bound), total))
+        return out
+
+
+def _fmt(value: float) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metrics:
+    """Recorder called by the analyzer: `stage(name, seconds)` and `feed(messages)`."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.stages: Dict[str, Histogram] = {name: Histogram(STAGE_BUCKETS) for name in STAGES}
+        self.messages = Histogram(MESSAGE_BUCKETS)
+        self.dispatch_phases: Dict[str, Histogram] = {name: Histogram(STAGE_BUCKETS) for name in DISPATCH_PHASES}
+
+    def stage(self, name: str, seconds: float) -> None:
+        with self._lock:
+            hist = self.stages.get(name)
+            if hist is None:
+                hist = self.stages[name] = Histogram(STAGE_BUCKETS)
+            hist.observe(seconds)
+
+    def feed(self, messages: int) -> None:
+        with self._lock:
+            self.messages.observe(messages)
+
+    def dispatch(self, queue_wait: float, execution: float) -> None:
+        with self._lock:
+            self.dispatch_phases["queue_wait"].observe(queue_wait)
+            self.dispatch_phases["execution"].observe(execution)
+
+    def render(self) -> str:
+        lines = [
+            "# HELP analyze_feed_stage_seconds Time spent in each analysis stage per feed.",
+            "# TYPE analyze_feed_stage_seconds histogram",
+        ]
+        with self._lock:
+            for name, hist in self.stages.items():
+                _render_histogram(lines, "analyze_feed_stage_seconds", hist, f'stage="{name}",')
+            lines += [
+                "# HELP analyze_feed_messages Messages analyzed per feed, after dropping those timestamped more than 5s in the future.",
+                "# TYPE analyze_feed_messages histogram",
+            ]
+            _render_histogram(lines, "analyze_feed_messages", self.messages, "")
+            lines += [
+                "# HELP analyze_feed_dispatch_seconds Time per request waiting for an analysis thread and running on it.",
+                "# TYPE analyze_feed_dispatch_seconds histogram",
+            ]
+            for name, hist in self.dispatch_phases.items():
+                _render_histogram(lines, "analyze_feed_dispatch_seconds", hist, f'phase="{name}",')
+        return "\n".join(lines) + "\n"
+
+
+def _render_histogram(lines: List[str], metric: str, hist: Histogram, labels: str) -> None:
+    for le, total in hist.cumulative():
+        lines.append(f'{metric}_bucket{{{labels}le="{le}"}} {total}')
+    suffix = "{" + labels.rstrip(",") + "}" if labels else ""
+    lines.append(f"{metric}_sum{suffix} {hist.sum!r}")
+    lines.append(f"{metric}_count{suffix} {hist.count}")
+
+
+_metrics: Optional[Metrics] = None
+_enabled = False
+
+
+def enable() -> Metrics:
+    global _metrics, _enabled
+    if _metrics is None:
+        _metrics = Metrics()
+    sentiment_analyzer.set_instrumentation(_metrics)
+    _enabled = True
+    return _metrics
+
+
+def disable() -> None:
+    global _enabled
+    sentiment_analyzer.set_instrumentation(None)
+    _enabled = False
+
+
+def dispatch(queue_wait: float, execution: float) -> None:
+    # Executor timings of one request (main.py); dropped while metrics are disabled
+    if _enabled:
+        _metrics.dispatch(queue_wait, execution)
+
+
+def render() -> str:
+    # Empty histograms while instrumentation has never been enabled
+    return (_metrics or Metrics()).render()
@@ -0,0 +1,65 @@
+"""Bounded executor that keeps CPU-bound analysis off the asyncio event loop.
+
+Analysis runs in a small thread pool: the interpreter switches threads every few
+milliseconds, so while a large feed is being analyzed the event loop still
+accepts connections and answers small requests. At most `workers` calls run at
+once and at most `queue_depth` more wait for a thread; past that `run` raises
+`QueueFull` right away (the endpoints answer 503) instead of letting the backlog
+and its memory grow without bound.
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Tuple
+
+
+class QueueFull(Exception):
+    pass
+
+
+class BoundedExecutor:
+    def __init__(self, workers: int, queue_depth: int) -> None:
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="analysis")
+        self._lock = threading.Lock()
+        self._pending = 0  # submitted and not finished: running plus queued
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _release(self, _future: Any) -> None:
+        # Done callback: also runs when a queued call is cancelled before it starts
+        with self._lock:
+            self._pending -= 1
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Tuple[Any, float, float]:
+        # (fn(*args), seconds waiting for a thread, seconds running)
+        with self._lock:
+            if self._pending >= self.workers + self.queue_depth:
+                raise QueueFull()
+            self._pending += 1
+        submitted = time.perf_counter()
+        timings = [0.0, 0.0]
+
+        def call() -> Any:
+            started = time.perf_counter()
+            timings[0] = started - submitted
+            try:
+                return fn(*args)
+            finally:
+                timings[1] = time.perf_counter() - started
+
+        try:
+            future = self._executor.submit(call)
+        except BaseException:
+            with self._lock:
+                self._pending -= 1
+            raise
+        future.add_done_callback(self._release)
+        result = await asyncio.wrap_future(future)
+        return result, timings[0], timings[1]
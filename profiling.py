@@ -0,0 +1,166 @@
+"""Opt-in profiling of a single analysis under cProfile and tracemalloc.
+
+`/analyze-feed` calls `profile_analyze_feed` instead of `analyze_feed` when the
+request carries an `X-Profile-Key` header listed in `PROFILE_KEYS`. Both passes
+run in a separate single-worker process, one profiled feed at a time. cProfile
+and tracemalloc are process-wide: tracemalloc traces every thread, and from
+Python 3.12 cProfile hooks sys.monitoring, which admits one profiler per process
+and reports the calls of all threads. In the server they would record the
+requests other executor threads serve, and a second concurrent profile would
+fail. The feed is analyzed twice, so that allocation tracing does not distort
+the timings:
+
+1. under cProfile: top functions by cumulative time; this run's result is
+   returned;
+2. under tracemalloc: overall peak, plus live allocations by line taken right
+   after ingestion, when the message store is complete and the result not yet
+   built.
+
+The worker's caches are not the server's: the cProfile pass starts them cold
+and includes filling them, the tracemalloc pass finds them warm.
+"""
+from __future__ import annotations
+
+import cProfile
+import json
+import multiprocessing
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import sentiment_analyzer
+from sentiment_analyzer import analyze_feed
+
+TOP_FUNCTIONS = 25
+TOP_LINES = 25
+
+# Profiled feeds run here, one at a time; started on the first profile.
+# Spawned rather than forked: the server process has executor threads running.
+_tracer: Optional[ProcessPoolExecutor] = None
+_tracer_lock = threading.Lock()
+
+
+class _SnapshotRecorder:
+    # Instrumentation recorder that snapshots allocations once the feed is complete
+    def __init__(self) -> None:
+        self.snapshot: Optional[tracemalloc.Snapshot] = None
+
+    def stage(self, name: str, seconds: float) -> None:
+        pass
+
+    def feed(self, messages: int) -> None:
+        if self.snapshot is None:
+            self.snapshot = tracemalloc.take_snapshot()
+
+
+def _top_functions(profiler: cProfile.Profile, limit: int) -> List[Dict[str, Any]]:
+    stats = pstats.Stats(profiler).stats  # {(file, line, func): (cc, nc, tottime, cumtime, callers)}
+    rows = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+    return [
+        {
+            "function": f"{file}:{line}({func})",
+            "calls": nc,
+            "tottime_ms": round(tt * 1000, 3),
+            "cumtime_ms": round(ct * 1000, 3),
+        }
+        for (file, line, func), (_, nc, tt, ct, _) in rows
+    ]
+
+
+def _top_lines(snapshot: tracemalloc.Snapshot, limit: int) -> List[Dict[str, Any]]:
+    snapshot = snapshot.filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),))
+    return [
+        {"line": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}", "size_kb": round(stat.size / 1024, 1), "count": stat.count}
+        for stat in snapshot.statistics("lineno")[:limit]
+    ]
+
+
+def _trace_allocations(
+    messages: List[Dict[str, Any]],
+    time_window_minutes: int,
+    now_utc: datetime,
+) -> Tuple[int, List[Dict[str, Any]]]:
+    # (peak bytes, top allocations by line)
+    recorder = _SnapshotRecorder()
+    tracemalloc.start()
+    try:
+        with sentiment_analyzer.instrumented(recorder):
+            analyze_feed(messages, time_window_minutes, now_utc)
+        _, peak = tracemalloc.get_traced_memory()
+        lines = _top_lines(recorder.snapshot, TOP_LINES) if recorder.snapshot is not None else []
+    finally:
+        tracemalloc.stop()
+    return peak, lines
+
+
+def _profile_in_tracer(
+    messages: List[Dict[str, Any]],
+    time_window_minutes: int,
+    now_utc: datetime,
+    lexicon: sentiment_analyzer.Lexicon,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    # Runs in the tracer process
+    sentiment_analyzer.set_lexicon(lexicon)
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    profiler.enable()
+    try:
+        result = analyze_feed(messages, time_window_minutes, now_utc)
+    finally:
+        profiler.disable()
+    elapsed = time.perf_counter() - started
+    peak, lines = _trace_allocations(messages, time_window_minutes, now_utc)
+
+    report = {
+        "messages": len(messages),
+        "profiled_ms": round(elapsed * 1000, 3),
+        "top_functions": _top_functions(profiler, TOP_FUNCTIONS),
+        "peak_memory_kb": round(peak / 1024, 1),
+        "allocations_by_line": lines,
+    }
+    return result, report
+
+
+def _tracer_pool() -> ProcessPoolExecutor:
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            _tracer = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+        return _tracer
+
+
+def stop_tracer() -> None:
+    global _tracer
+    with _tracer_lock:
+        if _tracer is not None:
+            _tracer.shutdown(cancel_futures=True)
+        _tracer = None
+
+
+def profile_analyze_feed(
+    messages: List[Dict[str, Any]],
+    time_window_minutes: int,
+    now_utc: datetime,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    # Concurrent profiles queue behind the single worker
+    return _tracer_pool().submit(_profile_in_tracer, messages, time_window_minutes, now_utc, sentiment_analyzer._lexicon).result()
+
+
+def write_report(report: Dict[str, Any], directory: str) -> str:
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"profile-{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def allowed_keys(value: Optional[str]) -> frozenset:
+    # Comma-separated allowlist, e.g. PROFILE_KEYS="ops-1,customer-42"
+    return frozenset(key.strip() for key in (value or "").split(",") if key.strip())
+
@@ -0,0 +1,139 @@
+"""Bounded LRU + TTL cache of /analyze-feed results.
+
+The key is a SHA-256 digest of the canonicalized request: the message fields the
+analyzer reads (defaults filled in, unknown keys and message ids dropped, order
+kept), the window(s) and the reference instant in microseconds. Requests that carry
+`reference_time` are deterministic and always cacheable. Requests without one
+are cached only when a time bucket is configured: they are keyed by the start of
+the current bucket but analyzed at the real clock, so messages posted a moment
+ago still count. A cached answer for them is up to one bucket (and at most the
+TTL) older than a fresh one.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+try:  # Required (requirements.txt); the stdlib fallback only keeps a broken install working
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _canonical(
+    messages: List[Dict[str, Any]],
+    time_window_minutes: int,
+    now_utc: datetime,
+    time_windows_minutes: Optional[List[int]] = None,
+    bucketed: bool = False,
+) -> bytes:
+    rows = [
+        (
+            m.get("content"),
+            m.get("timestamp"),
+            m.get("user_id"),
+            m.get("hashtags", []),
+            m.get("reactions", 0),
+            m.get("shares", 0),
+            m.get("views", 0),
+        )
+        for m in messages
+    ]
+    since_epoch = now_utc - _EPOCH
+    doc = [bucketed, time_window_minutes, time_windows_minutes, since_epoch.days, since_epoch.seconds, since_epoch.microseconds, rows]
+    if orjson is not None:
+        try:
+            return orjson.dumps(doc)
+        except TypeError:  # e.g. integers beyond 64 bits
+            pass
+    return json.dumps(doc, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class ResultCache:
+    def __init__(self, max_entries: int, ttl_seconds: float, bucket_seconds: int = 0) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.bucket_seconds = bucket_seconds
+        self._entries: "OrderedDict[bytes, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def bucket_start(self, now_utc: datetime) -> datetime:
+        # Cache instant for requests without reference_time (bucketing enabled)
+        seconds = int(now_utc.timestamp())
+        return datetime.fromtimestamp(seconds - seconds % self.bucket_seconds, tz=timezone.utc)
+
+    def key(
+        self,
+        messages: List[Dict[str, Any]],
+        time_window_minutes: int,
+        now_utc: datetime,
+        time_windows_minutes: Optional[List[int]] = None,
+        bucketed: bool = False,
+    ) -> bytes:
+        # bucketed: now_utc is a bucket start, never shared with a reference_time of that instant
+        return hashlib.sha256(_canonical(messages, time_window_minutes, now_utc, time_windows_minutes, bucketed)).digest()
+
+    def get(self, key: bytes) -> Optional[Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or now - entry[0] > self.ttl_seconds:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: bytes, result: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def render_prometheus(self) -> str:
+        stats = self.stats()
+        lines = []
+        for name, kind, value, help_text in (
+            ("hits_total", "counter", stats["hits"], "Requests answered from the result cache."),
+            ("misses_total", "counter", stats["misses"], "Cacheable requests that had to be analyzed."),
+            ("evictions_total", "counter", stats["evictions"], "Results dropped to stay within the size limit."),
+            ("entries", "gauge", stats["size"], "Results currently cached."),
+        ):
+            lines.append(f"# HELP analyze_feed_result_cache_{name} {help_text}")
+            lines.append(f"# TYPE analyze_feed_result_cache_{name} {kind}")
+            lines.append(f"analyze_feed_result_cache_{name} {value}")
+        return "\n".join(lines) + "\n"
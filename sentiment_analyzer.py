@@ -1,17 +1,53 @@
 from __future__ import annotations
 
-from typing import List, Dict, Any, Tuple, Optional
+from typing import List, Dict, Any, Tuple, Optional, Iterable
+from array import array
+from collections import deque
+from contextvars import ContextVar
 from dataclasses import dataclass
 from datetime import datetime, timezone, timedelta
+from functools import lru_cache
+from itertools import accumulate
+import bisect
 import hashlib
 import heapq
 import math
+import os
 import re
 import unicodedata
+from concurrent.futures import ProcessPoolExecutor
 
 import time
 from contextlib import contextmanager
 
+try:  # Optional: vectorized aggregation for large feeds
+    import numpy as np
+except ImportError:  # pragma: no cover - pure Python fallback
+    np = None
+
+# With NumPy available: influence ranking is vectorized from this many distinct users (below,
+# array setup costs more than it saves), window prefix sums from this many distinct seconds
+NUMPY_MIN_USERS = 200
+NUMPY_MIN_MESSAGES = 5000
+
+# Distinct non-ASCII tokens/user ids kept in the normalization LRU cache
+NORMALIZE_CACHE_SIZE = 8192
+
+# Distinct user ids whose simulated follower count is kept in memory
+FOLLOWERS_CACHE_SIZE = 65536
+
+# Distinct timestamp strings whose parsed epoch is kept in memory
+TIMESTAMP_CACHE_SIZE = 4096
+
+# Distinct (content, employee flag) pairs whose sentiment is kept in memory
+SENTIMENT_CACHE_SIZE = 4096
+
+# Feeds with at least this many messages are scored in the worker pool, once started
+PARALLEL_MIN_MESSAGES = 20000
+
+# Messages per task sent to a pool worker
+PARALLEL_CHUNK_SIZE = 2000
+
 
 USER_ID_REGEX = re.compile(r"^user_[a-z0-9_]{3,}$", re.IGNORECASE)
 
@@ -25,12 +61,37 @@ INTENSIFIERS = ["muito", "super", "extremamente"]
 NEGATIONS = ["não", "nunca", "jamais"]
 
 
-def _strip_accents_lower(s: str) -> str:
+def _fold_accents(s: str) -> str:
     nfkd = unicodedata.normalize("NFKD", s)
     no_acc = "".join(ch for ch in nfkd if not unicodedata.combining(ch))
     return no_acc.lower()
 
 
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def _fold_accents_cached(s: str) -> str:
+    return _fold_accents(s)
+
+
+def _strip_accents_lower(s: str) -> str:
+    # Tokens, user ids and lexicon entries repeat across feeds: NFKD is the identity on
+    # ASCII, so only non-ASCII strings reach unicodedata, through a bounded LRU cache.
+    if s.isascii():
+        return s.lower()
+    return _fold_accents_cached(s)
+
+
+def _fold_text(s: str) -> str:
+    # Same normalization for whole contents, which rarely repeat: bypass the cache
+    if s.isascii():
+        return s.lower()
+    return _fold_accents(s)
+
+
+def normalization_cache_info() -> Dict[str, int]:
+    info = _fold_accents_cached.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "maxsize": info.maxsize}
+
+
 POSITIVE_SET = {_strip_accents_lower(w) for w in POSITIVE_WORDS}
 NEGATIVE_SET = {_strip_accents_lower(w) for w in NEGATIVE_WORDS}
 INTENSIFIER_SET = {_strip_accents_lower(w) for w in INTENSIFIERS}
@@ -71,32 +132,180 @@ def _is_mbras_employee(user_id: str) -> bool:
     return "mbras" in user_id.lower()
 
 
+WHITESPACE_RE = re.compile(r"\s+")
+CANDIDATE_PHRASE = _fold_text("teste técnico mbras")
+
+
 def _candidate_awareness(content: str) -> bool:
     # Normalize removing punctuation and multiple spaces; case-insensitive; accents-insensitive matching
     norm = PUNCT_RE.sub(" ", content).strip()
-    norm = re.sub(r"\s+", " ", norm)
-    return _strip_accents_lower(norm) == _strip_accents_lower("teste técnico mbras")
+    norm = WHITESPACE_RE.sub(" ", norm)
+    return _fold_text(norm) == CANDIDATE_PHRASE
 
 
 def _is_meta_message(content: str) -> bool:
     return _candidate_awareness(content)
 
 
-def _tokenize(content: str) -> List[Tuple[str, str]]:
-    # Returns list of (original_token, normalized_for_lexicon). Hashtags are kept as tokens
+def _normalized_tokens(content: str) -> List[str]:
+    # Tokens normalized for lexicon matching. Hashtags are kept as tokens (and counted)
     # but will not match the lexicon; emojis are ignored.
-    tokens: List[Tuple[str, str]] = []
-    for m in TOKEN_RE.finditer(content):
-        tok = m.group(0)
-        tokens.append((tok, _strip_accents_lower(tok)))
-    return tokens
-
-
+    return [_strip_accents_lower(tok) for tok in TOKEN_RE.findall(content)]
+
+
+# Lexicon entry kinds, in precedence order when an expression is listed more than once
+INTENSIFIER, NEGATION, POSITIVE, NEGATIVE = 1, 2, 3, 4
+_LEXICON_KINDS = {"intensifier": INTENSIFIER, "negation": NEGATION, "positive": POSITIVE, "negative": NEGATIVE}
+
+
+class Lexicon:
+    """Token trie over normalized lexicon expressions.
+
+    Each node is ``[kind, children]``; ``kind`` is 0 for a pure prefix of a
+    longer expression. Matching takes the longest expression starting at each
+    token, so multi-word entries ("nada mal", "deixa a desejar") act as one
+    lexicon unit and a whole message is matched in one left-to-right pass.
+    """
+
+    def __init__(
+        self,
+        positive: Iterable[str] = (),
+        negative: Iterable[str] = (),
+        intensifiers: Iterable[str] = (),
+        negations: Iterable[str] = (),
+    ) -> None:
+        self.root: Dict[str, list] = {}
+        self.size = 0
+        self._fingerprint: Optional[bytes] = None
+        for kind, words in ((INTENSIFIER, intensifiers), (NEGATION, negations), (POSITIVE, positive), (NEGATIVE, negative)):
+            for w in words:
+                self.add(w, kind)
+
+    def add(self, expression: str, kind: int) -> None:
+        tokens = _normalized_tokens(expression)
+        if not tokens:
+            return
+        children = self.root
+        for depth, tok in enumerate(tokens, 1):
+            node = children.get(tok)
+            if node is None:
+                node = children[tok] = [0, None]
+            if depth < len(tokens):
+                if node[1] is None:
+                    node[1] = {}
+                children = node[1]
+        if not node[0]:
+            self.size += 1
+        if not node[0] or kind < node[0]:
+            node[0] = kind
+        self._fingerprint = None
+
+    @classmethod
+    def from_file(cls, path: str) -> "Lexicon":
+        # One "<kind>\t<expression>" per line; kind is positive/negative/intensifier/negation.
+        # Blank lines and lines starting with "#" are ignored.
+        lexicon = cls()
+        with open(path, encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                kind, _, expression = line.partition("\t")
+                if kind.strip().lower() not in _LEXICON_KINDS or not expression.strip():
+                    raise ValueError(f"{path}:{line_no}: expected '<kind>\\t<expression>'")
+                lexicon.add(expression, _LEXICON_KINDS[kind.strip().lower()])
+        return lexicon
+
+    @property
+    def fingerprint(self) -> bytes:
+        # Identifies the entries, not the insertion order: equal across processes that load
+        # the same lexicon, so cached scores can be shared between them
+        if self._fingerprint is None:
+            h = hashlib.blake2b(digest_size=8)
+            stack = [((), self.root)]
+            while stack:
+                prefix, children = stack.pop()
+                for tok in sorted(children):
+                    kind, sub = children[tok]
+                    path = prefix + (tok,)
+                    if kind:
+                        h.update(f"{kind}\t{' '.join(path)}\n".encode("utf-8", "surrogatepass"))
+                    if sub:
+                        stack.append((path, sub))
+            self._fingerprint = h.digest()
+        return self._fingerprint
+
+    def scan(self, tokens: List[str]) -> Iterable[Tuple[int, int]]:
+        # Yields (kind, tokens consumed) for each unit; kind 0 is a non-lexicon token
+        root = self.root
+        i = 0
+        n = len(tokens)
+        while i < n:
+            node = root.get(tokens[i])
+            kind = 0
+            length = 1
+            if node is not None:
+                kind = node[0]
+                j = i + 1
+                while node[1] and j < n:
+                    node = node[1].get(tokens[j])
+                    if node is None:
+                        break
+                    j += 1
+                    if node[0]:
+                        kind = node[0]
+                        length = j - i
+            yield kind, length
+            i += length
+
+
+DEFAULT_LEXICON = Lexicon(POSITIVE_WORDS, NEGATIVE_WORDS, INTENSIFIERS, NEGATIONS)
+_lexicon = DEFAULT_LEXICON
+
+
+def set_lexicon(lexicon: Optional[Lexicon]) -> None:
+    # None restores the built-in lexicon
+    global _lexicon
+    _lexicon = lexicon if lexicon is not None else DEFAULT_LEXICON
+    _sentiment_for_message.cache_clear()
+    # Pool workers hold their own copy of the lexicon
+    if _pool is not None:
+        start_scoring_pool(_pool_workers)
+
+
+@lru_cache(maxsize=SENTIMENT_CACHE_SIZE)
 def _sentiment_for_message(content: str, is_mbras_emp: bool) -> Tuple[float, str]:
+    # Bots and retweets repeat the same text: a hit skips the meta check and tokenization.
+    # Depends on the active lexicon too, hence the cache_clear() in set_lexicon.
+    shared = _shared_cache
+    if shared is not None:
+        cached = shared.get_sentiment(_lexicon.fingerprint, content, is_mbras_emp)
+        if cached is not None:
+            return cached
     if _is_meta_message(content):
-        return 0.0, "meta"
+        result = 0.0, "meta"
+    else:
+        result = _lexicon_sentiment(content, is_mbras_emp)
+    if shared is not None:
+        shared.put_sentiment(_lexicon.fingerprint, content, is_mbras_emp, result)
+    return result
+
+
+def sentiment_cache_info() -> Dict[str, Any]:
+    info = _sentiment_for_message.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "size": info.currsize,
+        "maxsize": info.maxsize,
+        "hit_rate": round(info.hits / lookups, 4) if lookups else 0.0,
+    }
+
 
-    tokens = _tokenize(content)
+def _lexicon_sentiment(content: str, is_mbras_emp: bool) -> Tuple[float, str]:
+    # Scoring for non-meta content; callers that already ran the meta check use this directly
+    tokens = _normalized_tokens(content)
     total_words = max(len(tokens), 1)
 
     next_multiplier = 1.0
@@ -107,20 +316,21 @@ def _sentiment_for_message(content: str, is_mbras_emp: bool) -> Tuple[float, str
     pos_sum = 0.0
     neg_sum = 0.0
 
-    for orig, norm in tokens:
-        if norm in INTENSIFIER_SET:
+    # A multi-word expression is one unit: it consumes/decrements negation scopes once
+    for kind, _ in _lexicon.scan(tokens):
+        if kind == INTENSIFIER:
             next_multiplier = 1.5
             # decrement existing negation scopes due to a token consumed
             neg_scopes = [n - 1 for n in neg_scopes if n - 1 > 0]
             continue
-        if norm in NEGATION_SET:
+        if kind == NEGATION:
             neg_scopes.append(3)
             continue
 
         polarity = 0  # +1 for positive word; -1 for negative word
-        if norm in POSITIVE_SET:
+        if kind == POSITIVE:
             polarity = +1
-        elif norm in NEGATIVE_SET:
+        elif kind == NEGATIVE:
             polarity = -1
 
         if polarity != 0:
@@ -155,7 +365,50 @@ def _sentiment_for_message(content: str, is_mbras_emp: bool) -> Tuple[float, str
     return score, label
 
 
+# Optional precomputed table (see followers_table.py), consulted before simulating
+_followers_table: Optional[Any] = None
+
+# Optional cross-process cache (see shared_cache.py) behind the per-process LRU caches
+_shared_cache: Optional[Any] = None
+
+
+def set_followers_table(table: Optional[Any]) -> None:
+    # `table` only needs a get(user_id) -> Optional[int]; None disables the lookup
+    global _followers_table
+    _followers_table = table
+    _followers_simulation.cache_clear()
+
+
+def set_shared_cache(cache: Optional[Any]) -> None:
+    # `cache` needs get_/put_followers and get_/put_sentiment; None disables the lookups
+    global _shared_cache
+    _shared_cache = cache
+    _followers_simulation.cache_clear()
+    _sentiment_for_message.cache_clear()
+
+
+@lru_cache(maxsize=FOLLOWERS_CACHE_SIZE)
 def _followers_simulation(user_id: str) -> int:
+    if _followers_table is not None:
+        followers = _followers_table.get(user_id)
+        if followers is not None:
+            return followers
+    shared = _shared_cache
+    if shared is None:
+        return _simulate_followers(user_id)
+    followers = shared.get_followers(user_id)
+    if followers is None:
+        followers = _simulate_followers(user_id)
+        shared.put_followers(user_id, followers)
+    return followers
+
+
+def followers_cache_info() -> Dict[str, int]:
+    info = _followers_simulation.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "maxsize": info.maxsize}
+
+
+def _simulate_followers(user_id: str) -> int:
     # Unicode normalization edge case trap - requires understanding NFKD
     normalized_id = unicodedata.normalize("NFKD", user_id)
     if normalized_id != user_id and "cafe" in normalized_id.lower():
@@ -180,8 +433,24 @@ def _followers_simulation(user_id: str) -> int:
     return base
 
 
+def _prime_sieve(limit: int) -> bytearray:
+    # sieve[n] == 1 iff n is prime, for 0 <= n < limit
+    sieve = bytearray([1]) * limit
+    sieve[0:2] = b"\x00\x00"
+    for i in range(2, int((limit - 1) ** 0.5) + 1):
+        if sieve[i]:
+            sieve[i * i::i] = bytes(len(range(i * i, limit, i)))
+    return sieve
+
+
+# Covers every simulated base follower count (100..10099)
+_PRIME_SIEVE = _prime_sieve(10100)
+
+
 def _is_prime(n: int) -> bool:
     """Helper function for algorithmic complexity trap"""
+    if 0 <= n < len(_PRIME_SIEVE):
+        return _PRIME_SIEVE[n] == 1
     if n < 2:
         return False
     if n == 2:
@@ -194,12 +463,12 @@ def _is_prime(n: int) -> bool:
     return True
 
 
-def _engagement_rate_user(agg: Dict[str, int]) -> float:
-    views = max(agg.get("views", 0), 1)
-    base_rate = (agg.get("reactions", 0) + agg.get("shares", 0)) / views
+def _engagement_rate_user(reactions: int, shares: int, views: int) -> float:
+    views = max(views, 1)
+    base_rate = (reactions + shares) / views
     
     # Algorithmic trap: engagement calculation becomes complex for specific patterns
-    total_interactions = agg.get("reactions", 0) + agg.get("shares", 0)
+    total_interactions = reactions + shares
     if total_interactions > 0 and total_interactions % 7 == 0:
         # Golden ratio-based adjustment for multiples of 7
         phi = (1 + 5**0.5) / 2  # Golden ratio
@@ -212,7 +481,8 @@ def _build_error(message: str, code: str = "INVALID_INPUT") -> ValidationError:
     return ValidationError(message=message, code=code)
 
 
-def _validate_message(m: Dict[str, Any]) -> None:
+def _validate_message(m: Dict[str, Any]) -> int:
+    # Returns the timestamp as epoch seconds; the message dict itself is left untouched
     if not isinstance(m.get("content"), str):
         raise _build_error("Campo 'content' inválido", code="INVALID_CONTENT")
     if len(m["content"]) > 280:
@@ -240,209 +510,446 @@ def _validate_message(m: Dict[str, Any]) -> None:
             raise _build_error(f"Campo '{k}' inválido", code="INVALID_NUMBER")
 
     # timestamp
-    dt = parse_iso8601(m.get("timestamp", ""))
-    m["_dt"] = dt
+    ts = m.get("timestamp", "")
+    if type(ts) is not str:
+        return (parse_iso8601(ts) - _EPOCH) // _SECOND  # not a string: fails as it always did
+    return _parse_epoch_seconds(ts)
 
 
-def _filter_future(messages: List[Dict[str, Any]], now_utc: datetime) -> List[Dict[str, Any]]:
-    res = []
-    for m in messages:
-        ts = m["_dt"]
-        if ts <= now_utc + timedelta(seconds=5):
-            m["_dt"] = ts
-            res.append(m)
-    return res
+# date.toordinal() of 1970-01-01
+_EPOCH_ORDINAL = 719163
 
 
-def _window_anchor(now_utc: datetime) -> datetime:
-    return now_utc
+@lru_cache(maxsize=TIMESTAMP_CACHE_SIZE)
+def _parse_epoch_seconds(ts: str) -> int:
+    # Feeds repeat the same second many times: the cache answers those without parsing.
+    # Accepts and rejects exactly what parse_iso8601 does, with the same messages, but
+    # checks the layout at fixed offsets instead of the regex and skips the tz-aware datetime.
+    s = ts.strip()
+    if len(s) == 20 and s[4] == "-" and s[7] == "-" and s[10] == "T" and s[13] == ":" and s[16] == ":" and s[19] == "Z":
+        try:
+            dt = datetime.fromisoformat(s[:-1])
+        except ValueError:
+            dt = None
+        if dt is not None:
+            return (dt.toordinal() - _EPOCH_ORDINAL) * 86400 + dt.hour * 3600 + dt.minute * 60 + dt.second
+        # fromisoformat only takes ASCII digits; \d (what RFC3339_Z_RE uses) takes any decimal
+        # digit, and those timestamps failed in fromisoformat before too
+        if (s[0:4] + s[5:7] + s[8:10] + s[11:13] + s[14:16] + s[17:19]).isdecimal():
+            raise ValidationError(f"Timestamp inválido: {s}", code="INVALID_TIMESTAMP")
+    raise ValidationError(f"Timestamp inválido (RFC3339 com 'Z' obrigatório): {s}", code="INVALID_TIMESTAMP")
 
 
-def _within_window(m: Dict[str, Any], anchor: datetime, minutes: int) -> bool:
-    return m["_dt"] >= (anchor - timedelta(minutes=minutes)) and m["_dt"] <= anchor
+def timestamp_cache_info() -> Dict[str, int]:
+    info = _parse_epoch_seconds.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "maxsize": info.maxsize}
 
 
-def _trending_topics(window_msgs: List[Dict[str, Any]], anchor: datetime) -> List[str]:
-    start = time.perf_counter()
+def _window_anchor(now_utc: datetime) -> datetime:
+    return now_utc
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_US = timedelta(microseconds=1)
+_SECOND = timedelta(seconds=1)
+
+
+def _epoch_us(dt: datetime) -> int:
+    # Exact integer microseconds, so comparisons and ages match datetime arithmetic
+    return (dt - _EPOCH) // _US
+
+
+class MessageStore:
+    """Column-oriented storage for validated messages.
+
+    Each message is one row across parallel arrays of epoch seconds, interned
+    user index and sentiment sign (13 bytes), the columns the anomaly pass
+    reads when messages arrive out of order. User ids are interned into a
+    table, with reactions, shares and views summed per user as messages
+    arrive. Everything else is folded on arrival by FeedAccumulator.
+    """
+
+    __slots__ = ("epochs", "user_idx", "signs", "users", "user_reactions", "user_shares", "user_views", "_user_index")
+
+    def __init__(self) -> None:
+        self.epochs = array("q")
+        self.user_idx = array("i")
+        self.signs = array("b")
+        self.users: List[str] = []
+        # Totals per interned user
+        self.user_reactions = array("q")
+        self.user_shares = array("q")
+        self.user_views = array("q")
+        self._user_index: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.epochs)
+
+    def append(self, epoch: int, user_id: str, sign: int, reactions: int, shares: int, views: int) -> int:
+        # Returns the interned user index
+        idx = self._user_index.get(user_id)
+        if idx is None:
+            idx = self._user_index[user_id] = len(self.users)
+            self.users.append(user_id)
+            self.user_reactions.append(0)
+            self.user_shares.append(0)
+            self.user_views.append(0)
+        totals = self.user_reactions[idx] + reactions, self.user_shares[idx] + shares, self.user_views[idx] + views
+        try:
+            self.user_reactions[idx], self.user_shares[idx], self.user_views[idx] = totals
+        except OverflowError:
+            # Totals beyond int64 are still valid input: fall back to plain lists
+            self.user_reactions, self.user_shares, self.user_views = (
+                list(self.user_reactions), list(self.user_shares), list(self.user_views)
+            )
+            self.user_reactions[idx], self.user_shares[idx], self.user_views[idx] = totals
+        self.epochs.append(epoch)
+        self.user_idx.append(idx)
+        self.signs.append(sign)
+        return idx
+
+    def is_chronological(self) -> bool:
+        epochs = self.epochs
+        return all(a <= b for a, b in zip(epochs, epochs[1:]))
+
+
+def _sentiment_sign(label: Optional[str]) -> int:
+    if label == "positive":
+        return +1
+    if label == "negative":
+        return -1
+    return 0
+
+
+# Algorithmic trap: trending topics influenced by sentiment (indexed by sign)
+_SENTIMENT_MULTIPLIER = {+1: 1.2, -1: 0.8, 0: 1.0}
+
+
+def _hashtag_weight(tag: str, age_us: int, sentiment_multiplier: float) -> float:
     # Peso: 1 + 1 / max(minutos_desde_postagem, 0.01)
-    weights: Dict[str, float] = {}
-    counts: Dict[str, int] = {}
-    sentiment_weights: Dict[str, float] = {}  # Cross-validation trap
-    
-    for m in window_msgs:
-        sentiment_multiplier = 1.0
-        # Algorithmic trap: trending topics influenced by sentiment
-        if m.get("_sentiment_label") == "positive":
-            sentiment_multiplier = 1.2
-        elif m.get("_sentiment_label") == "negative":
-            sentiment_multiplier = 0.8
-            
-        for h in m.get("hashtags", []):
-            tag = h.lower()
-            delta_min = max((anchor - m["_dt"]).total_seconds() / 60.0, 0.0)
-            base_peso = 1.0 + (1.0 / max(delta_min, 0.01))
-            
-            # Complex weighting trap requiring understanding of log functions
-            if len(tag) > 8:  # Long hashtags get logarithmic decay
-                length_factor = math.log10(len(tag)) / math.log10(8)
-                base_peso *= length_factor
-            
-            peso = base_peso * sentiment_multiplier
-            weights[tag] = weights.get(tag, 0.0) + peso
-            counts[tag] = counts.get(tag, 0) + 1
-            sentiment_weights[tag] = sentiment_weights.get(tag, 0.0) + sentiment_multiplier
-
-    items = list(weights.items())
-    # Enhanced sorting with sentiment weight tie-breaker
-    items.sort(key=lambda kv: (-kv[1], -counts.get(kv[0], 0), -sentiment_weights.get(kv[0], 0), kv[0]))
-    ms = (time.perf_counter() - start) * 1000
-    print(f"trending_topics: {ms:.2f} ms")
-    return [k for k, _ in items[:5]]
-
-
-def _detect_anomalies(all_msgs: List[Dict[str, Any]]) -> Tuple[bool, Optional[str]]:
-    start = time.perf_counter()
-    if not all_msgs:
-        return False, None
-    # synchronized posting tolerant: at least 3 messages and all within ±2 seconds
-    if len(all_msgs) >= 3:
-        secs = [m["_dt"].replace(microsecond=0) for m in all_msgs]
-        min_sec = min(secs)
-        max_sec = max(secs)
-        if (max_sec - min_sec) <= timedelta(seconds=2):
+    delta_min = max((age_us / 1_000_000) / 60.0, 0.0)
+    base_peso = 1.0 + (1.0 / max(delta_min, 0.01))
+
+    # Complex weighting trap requiring understanding of log functions
+    if len(tag) > 8:  # Long hashtags get logarithmic decay
+        length_factor = math.log10(len(tag)) / math.log10(8)
+        base_peso *= length_factor
+
+    return base_peso * sentiment_multiplier
+
+
+def _top_tags(
+    tags: List[str], weights: List[float], counts: List[int], sentiment_weights: List[float], k: int = 5
+) -> List[str]:
+    # Enhanced sorting with sentiment weight tie-breaker; exact top k via a bounded heap
+    order = heapq.nsmallest(k, range(len(tags)), key=lambda t: (-weights[t], -counts[t], -sentiment_weights[t], tags[t]))
+    return [tags[t] for t in order]
+
+
+class ExactTrending:
+    """Exact trending weights, one counter per distinct hashtag.
+
+    Same interface as SpaceSavingTrending. The window anchor is fixed, so an
+    occurrence's decayed weight is final on arrival and is summed as it comes,
+    in arrival order.
+    """
+
+    def __init__(self) -> None:
+        self.tags: List[str] = []
+        self.weights: List[float] = []
+        self.counts: List[int] = []
+        self.sentiment_weights: List[float] = []  # Cross-validation trap
+        self._index: Dict[str, int] = {}
+
+    def add(self, tag: str, weight: float, sentiment_multiplier: float) -> None:
+        tid = self._index.get(tag)
+        if tid is None:
+            tid = self._index[tag] = len(self.tags)
+            self.tags.append(tag)
+            self.weights.append(0.0)
+            self.counts.append(0)
+            self.sentiment_weights.append(0.0)
+        self.weights[tid] += weight
+        self.counts[tid] += 1
+        self.sentiment_weights[tid] += sentiment_multiplier
+
+    def error_bound(self) -> float:
+        return 0.0
+
+    def top(self, k: int = 5) -> List[Tuple[str, float, float]]:
+        best = _top_tags(self.tags, self.weights, self.counts, self.sentiment_weights, k)
+        return [(tag, self.weights[self._index[tag]], 0.0) for tag in best]
+
+
+class SpaceSavingTrending:
+    """Bounded-memory trending over unbounded hashtag streams (weighted Space-Saving).
+
+    Keeps at most `capacity` counters. Each occurrence adds its full trending
+    weight (time decay x length factor x sentiment multiplier). When a new tag
+    arrives with every counter taken, it replaces the smallest counter and
+    inherits its weight as `error`, so a tracked tag's true weight lies in
+    ``[weight - error, weight]`` and an untracked tag's is at most
+    `error_bound()`. While distinct tags fit in `capacity` the sketch is exact.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        if capacity < 5:
+            raise ValueError("capacity must be >= 5")
+        self.capacity = capacity
+        self.counters: Dict[str, List[float]] = {}  # tag -> [weight, error, count, sentiment_weight]
+        # One (weight, tag) entry per counter; weights only grow, so an entry is a lower
+        # bound and is refreshed lazily when it reaches the top
+        self._heap: List[Tuple[float, str]] = []
+
+    def add(self, tag: str, weight: float, sentiment_multiplier: float) -> None:
+        counter = self.counters.get(tag)
+        if counter is None:
+            if len(self.counters) < self.capacity:
+                counter = self.counters[tag] = [weight, 0.0, 1, sentiment_multiplier]
+            else:
+                floor = self._pop_min()
+                counter = self.counters[tag] = [floor + weight, floor, 1, sentiment_multiplier]
+            heapq.heappush(self._heap, (counter[0], tag))
+            return
+        counter[0] += weight
+        counter[2] += 1
+        counter[3] += sentiment_multiplier
+
+    def _pop_min(self) -> float:
+        heap = self._heap
+        while True:
+            weight, tag = heap[0]
+            current = self.counters[tag][0]
+            if current == weight:
+                heapq.heappop(heap)
+                del self.counters[tag]
+                return weight
+            heapq.heapreplace(heap, (current, tag))
+
+    def error_bound(self) -> float:
+        # Largest possible overestimate of any reported weight
+        if len(self.counters) < self.capacity:
+            return 0.0
+        return max(c[1] for c in self.counters.values())
+
+    def top(self, k: int = 5) -> List[Tuple[str, float, float]]:
+        # [(tag, weight, error)] ordered like the exact trending ranking
+        best = heapq.nsmallest(k, self.counters.items(), key=lambda kv: (-kv[1][0], -kv[1][2], -kv[1][3], kv[0]))
+        return [(tag, c[0], c[1]) for tag, c in best]
+
+
+def _has_burst(ts_sorted: List[int]) -> bool:
+    # Burst: >10 messages from same user in 5 minutes (epoch seconds, ascending)
+    i = 0
+    for j in range(len(ts_sorted)):
+        while ts_sorted[j] - ts_sorted[i] > 300:
+            i += 1
+        if (j - i + 1) > 10:
+            return True
+    return False
+
+
+def _has_alternation(signs: Iterable[int]) -> bool:
+    # look for a run of length >=10 exact alternation ignoring zeros (zeros break the sequence)
+    current_len = 0
+    prev_sign = 0
+    for sign in signs:
+        if sign == 0:
+            current_len = 0
+            prev_sign = 0
+            continue
+        if prev_sign == 0 or sign != -prev_sign:
+            current_len = 1
+        else:
+            current_len += 1
+        prev_sign = sign
+        if current_len >= 10:
+            return True
+    return False
+
+
+class AnomalyDetector:
+    """Streaming anomaly detection with per-user state machines.
+
+    Feed messages in chronological order (ties in arrival order) through
+    `observe`; users are dense integer ids. Per user it keeps a ring of the
+    last 10 timestamps (burst: the 11th message within 300s of the one 10
+    before it) and the current alternation run, so memory is O(users) and a
+    pass is O(messages).
+    """
+
+    _RING = 10
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.min_ts = 0
+        self.max_ts = 0
+        self.burst = False
+        self.alternating = False
+        self._seen = array("q")  # messages per user
+        self._ring = array("q")  # last _RING timestamps per user
+        self._prev_sign = array("b")
+        self._run = array("q")
+
+    def _grow(self, user: int) -> None:
+        extra = max(user + 1, 2 * len(self._seen)) - len(self._seen)
+        self._seen.extend(array("q", bytes(8 * extra)))
+        self._ring.extend(array("q", bytes(8 * extra * self._RING)))
+        self._prev_sign.extend(array("b", bytes(extra)))
+        self._run.extend(array("q", bytes(8 * extra)))
+
+    def observe(self, user: int, ts: int, sign: int) -> None:
+        if self.count == 0 or ts < self.min_ts:
+            self.min_ts = ts
+        if self.count == 0 or ts > self.max_ts:
+            self.max_ts = ts
+        self.count += 1
+        if user >= len(self._seen):
+            self._grow(user)
+
+        # Burst: >10 messages from same user in 5 minutes
+        seen = self._seen[user]
+        slot = user * self._RING + seen % self._RING
+        if seen >= self._RING and ts - self._ring[slot] <= 300:
+            self.burst = True
+        self._ring[slot] = ts
+        self._seen[user] = seen + 1
+
+        # Alternância exata: run of >=10 strictly alternating signs; neutral/meta breaks it
+        prev = self._prev_sign[user]
+        if sign == 0:
+            run = 0
+        elif prev == 0 or sign != -prev:
+            run = 1
+        else:
+            run = self._run[user] + 1
+        self._prev_sign[user] = sign
+        self._run[user] = run
+        if run >= 10:
+            self.alternating = True
+
+    def result(self) -> Tuple[bool, Optional[str]]:
+        if self.count == 0:
+            return False, None
+        # synchronized posting tolerant: at least 3 messages and all within ±2 seconds
+        if self.count >= 3 and self.max_ts - self.min_ts <= 2:
             return True, "synchronized_posting"
+        if self.burst:
+            return True, "burst"
+        if self.alternating:
+            return True, "alternating_sentiment"
+        return False, None
 
-    # Burst: >10 messages from same user in 5 minutes
-    by_user: Dict[str, List[datetime]] = {}
-    for m in all_msgs:
-        by_user.setdefault(m["user_id"], []).append(m["_dt"])
-    for ts_list in by_user.values():
-        ts_list.sort()
-        i = 0
-        for j in range(len(ts_list)):
-            while ts_list[j] - ts_list[i] > timedelta(minutes=5):
-                i += 1
-            if (j - i + 1) > 10:
-                return True, "burst"
-
-    # Alternância exata: for each user, check +/- alternating pattern on sentiments for >=10 messages
-    for user, ts_list in by_user.items():
-        # we need sentiments per user's chronological sequence
-        user_msgs = [m for m in all_msgs if m["user_id"] == user]
-        user_msgs.sort(key=lambda x: x["_dt"])  # chronological
-        signs: List[int] = []
-        for m in user_msgs:
-            s = m.get("_sentiment_label")
-            if s == "positive":
-                signs.append(+1)
-            elif s == "negative":
-                signs.append(-1)
-            else:
-                signs.append(0)
-
-        # look for a run of length >=10 exact alternation ignoring zeros (zeros break the sequence)
-        current_len = 0
-        prev_sign = 0
-        for sign in signs:
-            if sign == 0:
-                current_len = 0
-                prev_sign = 0
-                continue
-            if prev_sign == 0:
-                current_len = 1
-                prev_sign = sign
-            else:
-                if sign == -prev_sign:
-                    current_len += 1
-                    prev_sign = sign
-                else:
-                    current_len = 1
-                    prev_sign = sign
-            if current_len >= 10:
-                return True, "alternating_sentiment"
 
-    ms = (time.perf_counter() - start) * 1000
-    print(f"detect_anomalies: {ms:.2f} ms")
-    return False, None
+def _detect_anomalies(store: MessageStore) -> Tuple[bool, Optional[str]]:
+    epochs, user_idx, signs = store.epochs, store.user_idx, store.signs
+    # One chronological pass (stable for equal timestamps); most feeds already arrive sorted
+    order = range(len(epochs)) if store.is_chronological() else sorted(range(len(epochs)), key=epochs.__getitem__)
+    detector = AnomalyDetector()
+    observe = detector.observe
+    for i in order:
+        observe(user_idx[i], epochs[i], signs[i])
+    return detector.result()
 
 
-def analyze_feed(messages: List[Dict[str, Any]], time_window_minutes: int, now_utc: datetime) -> Dict[str, Any]:
-    start = time.perf_counter()
-    # time_window_minutes > 0
-    if not isinstance(time_window_minutes, int) or time_window_minutes <= 0:
-        raise _build_error("'time_window_minutes' deve ser > 0", code="INVALID_TIME_WINDOW")
+def _sentiment_distribution(dist_counts: Dict[str, int], included: int) -> Dict[str, float]:
+    if included == 0:
+        return {"positive": 0.0, "negative": 0.0, "neutral": 0.0}
+    return {
+        "positive": round(100.0 * dist_counts["positive"] / included, 2),
+        "negative": round(100.0 * dist_counts["negative"] / included, 2),
+        "neutral": round(100.0 * dist_counts["neutral"] / included, 2),
+    }
 
-    # Validate messages individually
-    for m in messages:
-        _validate_message(m)
 
-    # Filter out messages from the future (> now + 5s)
-    valid_msgs = _filter_future(messages, now_utc)
+def _numpy_user_totals(store: MessageStore) -> Optional[Tuple[Any, Any, Any]]:
+    # Zero-copy int64 views of the per-user (reactions, shares, views) totals, or None when there
+    # are few users or sums could leave the range where float64 division stays exact.
+    if np is None or len(store.users) < NUMPY_MIN_USERS or isinstance(store.user_reactions, list):
+        return None
+    reactions = np.frombuffer(store.user_reactions, dtype=np.int64)
+    shares = np.frombuffer(store.user_shares, dtype=np.int64)
+    views = np.frombuffer(store.user_views, dtype=np.int64)
+    limit = float(2**53)
+    if reactions.sum(dtype=np.float64) + shares.sum(dtype=np.float64) >= limit or views.sum(dtype=np.float64) >= limit:
+        return None
+    return reactions, shares, views
 
-    anchor = _window_anchor(now_utc)
-    window_msgs: List[Dict[str, Any]] = [m for m in valid_msgs if _within_window(m, anchor, time_window_minutes)]
 
-    # Flags
-    flags = {
-        "mbras_employee": any(_is_mbras_employee(m["user_id"]) for m in valid_msgs),
-        "special_pattern": any((len(m["content"]) == 42 and ("mbras" in m["content"].lower())) for m in valid_msgs),
-        "candidate_awareness": any(_candidate_awareness(m["content"]) for m in valid_msgs),
-    }
+def _engagement_score(interactions: int, views: int, candidate_awareness: bool) -> float:
+    # Special-case easter egg: if candidate_awareness is true, set to 9.42 (per test spec)
+    if candidate_awareness:
+        return 9.42
+    return round(10.0 * (interactions / max(views, 1)), 2)
 
-    # Sentiment per message
-    dist_counts = {"positive": 0, "negative": 0, "neutral": 0}
-    included_for_dist = 0
-    for m in valid_msgs:
-        is_emp = _is_mbras_employee(m["user_id"])
-        score, label = _sentiment_for_message(m["content"], is_emp)
-        m["_sentiment_score"] = score
-        m["_sentiment_label"] = label
-        if label != "meta":
-            dist_counts[label] += 1
-            included_for_dist += 1
-
-    ms = (time.perf_counter() - start) * 1000
-    print(f"analyze_feed (PRIMEIRO): {ms:.2f} ms", flush=True)
-
-    start2 = time.perf_counter()
-
-    # Sentiment distribution in percentages
-    if included_for_dist == 0:
-        sentiment_distribution = {"positive": 0.0, "negative": 0.0, "neutral": 0.0}
+
+def _numpy_second_totals(totals: List[List[int]]) -> Optional[Any]:
+    # (n, 2) int64 array of [interactions, views] per second, or None when there are few
+    # seconds or the running sums could overflow int64
+    if np is None or len(totals) < NUMPY_MIN_MESSAGES:
+        return None
+    try:
+        columns = np.array(totals, dtype=np.int64).reshape(-1, 2)
+    except OverflowError:
+        return None
+    if (columns.sum(axis=0, dtype=np.float64) >= float(2**62)).any():
+        return None
+    return columns
+
+
+def _engagement_by_window(
+    second_totals: Dict[int, List[int]], anchor: datetime, windows: Iterable[int], candidate_awareness: bool
+) -> Dict[int, float]:
+    # _engagement_score for several windows at once from {epoch second: [interactions, views]}:
+    # seconds sorted once, prefix sums, two binary searches per window. Same integer sums,
+    # same rounding.
+    if candidate_awareness:
+        return {w: 9.42 for w in windows}
+    anchor_us = _epoch_us(anchor)
+    seconds = sorted(second_totals)
+    totals = [second_totals[sec] for sec in seconds]
+    columns = _numpy_second_totals(totals)
+    if columns is not None:
+        sorted_epochs = np.array(seconds, dtype=np.int64)
+        interactions = [0] + np.cumsum(columns[:, 0]).tolist()
+        views = [0] + np.cumsum(columns[:, 1]).tolist()
+
+        def first_index(epoch: int, side: str) -> int:
+            return int(np.searchsorted(sorted_epochs, epoch, side=side))
     else:
-        sentiment_distribution = {
-            "positive": round(100.0 * dist_counts["positive"] / included_for_dist, 2),
-            "negative": round(100.0 * dist_counts["negative"] / included_for_dist, 2),
-            "neutral": round(100.0 * dist_counts["neutral"] / included_for_dist, 2),
-        }
+        sorted_epochs = seconds
+        interactions = [0, *accumulate(i for i, _ in totals)]
+        views = [0, *accumulate(v for _, v in totals)]
 
-    # Global engagement score (all messages, within window as spec 7? It says global; use window to keep consistent with windowed metrics)
-    # The spec says global metric; to be consistent and bounded we compute over window messages.
-    sum_reactions_shares = sum((m.get("reactions", 0) + m.get("shares", 0)) for m in window_msgs)
-    sum_views = sum(m.get("views", 0) for m in window_msgs)
-    engagement_score = round(10.0 * (sum_reactions_shares / max(sum_views, 1)), 2)
-    # Special-case easter egg: if candidate_awareness is true, set to 9.42 (per test spec)
-    if flags.get("candidate_awareness"):
-        engagement_score = 9.42
+        def first_index(epoch: int, side: str) -> int:
+            return (bisect.bisect_left if side == "left" else bisect.bisect_right)(sorted_epochs, epoch)
+
+    # start_us <= epoch * 1e6 <= anchor_us, in whole seconds
+    hi = first_index(anchor_us // 1_000_000, "right")
+    scores = {}
+    for w in windows:
+        start_us = anchor_us - w * 60_000_000
+        lo = min(first_index(-(-start_us // 1_000_000), "left"), hi)
+        scores[w] = round(10.0 * ((interactions[hi] - interactions[lo]) / max(views[hi] - views[lo], 1)), 2)
+    return scores
+
+
+def _influence_ranking(store: MessageStore) -> List[Dict[str, Any]]:
+    totals = _numpy_user_totals(store)
+    if totals is not None:
+        return _influence_ranking_numpy(store, totals)
+    return _influence_ranking_python(store)
 
-    # Influence by user (window)
-    per_user: Dict[str, Dict[str, float]] = {}
-    for m in valid_msgs:
-        u = m["user_id"]
-        d = per_user.setdefault(u, {"reactions": 0, "shares": 0, "views": 0, "eng_rate": 0.0})
-        d["reactions"] += m.get("reactions", 0)
-        d["shares"] += m.get("shares", 0)
-        d["views"] += m.get("views", 0)
 
-    ms = (time.perf_counter() - start2) * 1000
-    print(f"analyze_feed (SEGUNDO): {ms:.2f} ms")
+def _influence_ranking_python(store: MessageStore) -> List[Dict[str, Any]]:
+    return _rank_users(zip(store.users, store.user_reactions, store.user_shares, store.user_views))
 
-    start3 = time.perf_counter()
 
+def _rank_users(totals: Iterable[Tuple[str, int, int, int]]) -> List[Dict[str, Any]]:
+    # totals yields (user_id, reactions, shares, views)
     ranking: List[Tuple[float, float, str]] = []  # (score, eng_rate, user_id)
-    scored: List[Dict[str, Any]] = []
-    for u, agg in per_user.items():
-        eng_rate = _engagement_rate_user(agg)
+    for u, r, s, v in totals:
+        eng_rate = _engagement_rate_user(r, s, v)
         base = _followers_simulation(u) * 0.4 + eng_rate * 0.6
         # post-processing
         if u.lower().endswith("007"):
@@ -453,26 +960,706 @@ def analyze_feed(messages: List[Dict[str, Any]], time_window_minutes: int, now_u
 
     # Top 10 with tie-breakers: higher engagement_rate then user_id asc
     ranking.sort(key=lambda t: (-t[0], -t[1], t[2]))
-    influence_ranking = [
+    return [
         {"user_id": u, "influence_score": round(s, 2)} for s, _, u in ranking[:10]
     ]
 
-    # Trending topics (window)
-    trending_topics = _trending_topics(valid_msgs, anchor) if anchor else []
 
-    # Anomalies (across the batch)
-    anomaly_detected, anomaly_type = _detect_anomalies(valid_msgs)
+def _influence_ranking_numpy(store: MessageStore, totals: Tuple[Any, Any, Any]) -> List[Dict[str, Any]]:
+    # Same arithmetic as _influence_ranking_python, one array operation per step for the
+    # engagement rates, scores and top-10 selection
+    reactions, shares, views = totals
+    users = store.users
+    n_users = len(users)
+    # Exact: the totals are below 2**53 (_numpy_user_totals)
+    interactions = (reactions + shares).astype(np.float64)
+    view_totals = views.astype(np.float64)
+
+    eng_rate = interactions / np.maximum(view_totals, 1.0)
+    # Golden ratio-based adjustment for multiples of 7
+    phi = (1 + 5**0.5) / 2
+    golden = (interactions > 0) & (np.fmod(interactions, 7.0) == 0) & (eng_rate > 0)
+    eng_rate = np.where(golden, eng_rate * (1 + 1/phi), eng_rate)
+
+    # Not vectorized: follower counts (a SHA-256 of the id, memoized) and the id-based flags
+    # are still computed one user at a time
+    followers = np.fromiter((_followers_simulation(u) for u in users), dtype=np.float64, count=n_users)
+    score = followers * 0.4 + eng_rate * 0.6
+    penalty = np.fromiter((u.lower().endswith("007") for u in users), dtype=bool, count=n_users)
+    score = np.where(penalty, score * 0.5, score)
+    bonus = np.fromiter((_is_mbras_employee(u) for u in users), dtype=bool, count=n_users)
+    score = np.where(bonus, score + 2.0, score)
+
+    # Partition down to everything tied with or above the 10th best score, then sort exactly
+    candidates = np.arange(n_users)
+    if n_users > 10:
+        kth = np.partition(score, n_users - 10)[n_users - 10]
+        candidates = np.flatnonzero(score >= kth)
+    ranking = [(float(score[i]), float(eng_rate[i]), users[i]) for i in candidates]
+    ranking.sort(key=lambda t: (-t[0], -t[1], t[2]))
+    return [
+        {"user_id": u, "influence_score": round(s, 2)} for s, _, u in ranking[:10]
+    ]
+
 
-    ms = (time.perf_counter() - start3) * 1000
-    print(f"analyze_feed (TERCEIRO): {ms:.2f} ms")
+def _build_result(
+    sentiment_distribution: Dict[str, float],
+    engagement_score: float,
+    trending_topics: List[str],
+    influence_ranking: List[Dict[str, Any]],
+    anomaly: Tuple[bool, Optional[str]],
+    flags: Dict[str, bool],
+) -> Dict[str, Any]:
     return {
         "analysis": {
             "sentiment_distribution": sentiment_distribution,
             "engagement_score": engagement_score,
             "trending_topics": trending_topics,
             "influence_ranking": influence_ranking,
-            "anomaly_detected": anomaly_detected,
-            "anomaly_type": anomaly_type,
+            "anomaly_detected": anomaly[0],
+            "anomaly_type": anomaly[1],
             "flags": flags,
         }
     }
+
+
+def _message_features(user_id: str, content: str) -> Tuple[bool, bool, bool, str]:
+    # (mbras employee, special pattern, candidate awareness, sentiment label) for one message
+    is_emp = _is_mbras_employee(user_id)
+    special = len(content) == 42 and "mbras" in content.lower()
+    # The awareness check is the meta-message check: "meta" is the only label it yields
+    _, label = _sentiment_for_message(content, is_emp)
+    return is_emp, special, label == "meta", label
+
+
+# Stage timing recorder (metrics.Metrics); None keeps timing calls off the hot path.
+# instrumented() replaces it for the current context only, e.g. one executor thread.
+_instrumentation: Optional[Any] = None
+_context_instrumentation: ContextVar[Optional[Any]] = ContextVar("instrumentation", default=None)
+
+
+def set_instrumentation(recorder: Optional[Any]) -> None:
+    # recorder.stage(name, seconds) per stage and recorder.feed(messages) per analyzed feed
+    global _instrumentation
+    _instrumentation = recorder
+
+
+@contextmanager
+def instrumented(recorder: Any):
+    # Analyses started in this context report to recorder; other threads keep the process-wide one
+    token = _context_instrumentation.set(recorder)
+    try:
+        yield
+    finally:
+        _context_instrumentation.reset(token)
+
+
+def _recorder() -> Optional[Any]:
+    recorder = _context_instrumentation.get()
+    return recorder if recorder is not None else _instrumentation
+
+
+@contextmanager
+def _stage(name: str):
+    recorder = _recorder()
+    if recorder is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        recorder.stage(name, time.perf_counter() - start)
+
+
+# Persistent pool for sentiment scoring of large feeds (see start_scoring_pool)
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+
+
+def _init_scoring_worker(lexicon: Lexicon) -> None:
+    # A forked worker inherits the parent's pool handle: drop it, it is not ours to manage
+    global _lexicon, _pool, _pool_workers, _instrumentation
+    _pool, _pool_workers = None, 0
+    _instrumentation = None  # timings recorded here would never reach the parent
+    _lexicon = lexicon
+    _sentiment_for_message.cache_clear()
+    # Touch the tokenizer, normalization and lexicon paths before the first real chunk
+    _message_features("user_warmup", "Não muito bom, teste técnico mbras! #warmup")
+
+
+def _worker_pid(_: int) -> int:
+    return os.getpid()
+
+
+def _score_chunk(items: List[Tuple[str, str]]) -> List[Tuple[bool, bool, bool, str]]:
+    return [_message_features(user_id, content) for user_id, content in items]
+
+
+def start_scoring_pool(workers: int) -> None:
+    # Replaces any running pool; workers are started and warmed here, not on the first feed
+    global _pool, _pool_workers
+    stop_scoring_pool()
+    if workers < 1:
+        raise ValueError("workers must be >= 1")
+    _pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_scoring_worker, initargs=(_lexicon,))
+    _pool_workers = workers
+    list(_pool.map(_worker_pid, range(workers)))
+
+
+def scoring_pool_workers() -> int:
+    # 0 when no pool is running
+    return _pool_workers
+
+
+def stop_scoring_pool() -> None:
+    global _pool, _pool_workers
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+    _pool = None
+    _pool_workers = 0
+
+
+class FeedAccumulator:
+    """Incremental, single-pass version of `analyze_feed`.
+
+    Messages are validated and scored as they arrive and appended to a
+    `MessageStore`; nothing is written back into the message dicts. Retained
+    state is a few dozen bytes per message plus the interned user and hashtag
+    tables, independent of content size.
+    """
+
+    def __init__(
+        self,
+        time_window_minutes: int,
+        now_utc: datetime,
+        trending_capacity: Optional[int] = None,
+        windows: Iterable[int] = (),
+    ) -> None:
+        # trending_capacity: track hashtags in a SpaceSavingTrending sketch of that size
+        # instead of one exact counter per tag (bounded memory for long streams).
+        # windows: extra windows window_results() will be asked for.
+        if not isinstance(time_window_minutes, int) or time_window_minutes <= 0:
+            raise _build_error("'time_window_minutes' deve ser > 0", code="INVALID_TIME_WINDOW")
+        self.time_window_minutes = time_window_minutes
+        self.anchor = _window_anchor(now_utc)
+        self._anchor_us = _epoch_us(self.anchor)
+        self._future_limit_us = _epoch_us(now_utc) + 5_000_000
+        self.flags = {"mbras_employee": False, "special_pattern": False, "candidate_awareness": False}
+        self.dist_counts = {"positive": 0, "negative": 0, "neutral": 0}
+        self.store = MessageStore()
+        self.trending = SpaceSavingTrending(trending_capacity) if trending_capacity else ExactTrending()
+        # Extra windows are answered from prefix sums over second -> [interactions, views],
+        # kept only when there are any; invalid ones are left to window_results() so that
+        # their error still comes after the messages'
+        # [interactions, views] over [anchor - time_window_minutes, anchor]
+        self._window_start_us = self._anchor_us - time_window_minutes * 60_000_000
+        self._window_totals = [0, 0]
+        self._windows = {w for w in windows if isinstance(w, int) and w > 0} - {time_window_minutes}
+        self._second_totals: Optional[Dict[int, List[int]]] = {} if self._windows else None
+        # Fed on arrival while messages come in chronological order; dropped in favour of a
+        # sorted pass over the store at the end as soon as one arrives out of order
+        self._detector: Optional[AnomalyDetector] = AnomalyDetector()
+        # Seconds spent in validation, sentiment and aggregation, when instrumented
+        self._recorder = _recorder()
+        self._timings = [0.0, 0.0, 0.0]
+
+    def add(self, m: Dict[str, Any]) -> None:
+        if self._recorder is not None:
+            self._add_timed(m)
+            return
+        epoch_us = self._admit(m)
+        if epoch_us is not None:
+            self._fold(m, epoch_us, _message_features(m["user_id"], m["content"]))
+
+    def _add_timed(self, m: Dict[str, Any]) -> None:
+        clock = time.perf_counter
+        timings = self._timings
+        t0 = clock()
+        epoch_us = self._admit(m)
+        t1 = clock()
+        timings[0] += t1 - t0
+        if epoch_us is None:
+            return
+        features = _message_features(m["user_id"], m["content"])
+        t2 = clock()
+        self._fold(m, epoch_us, features)
+        timings[1] += t2 - t1
+        timings[2] += clock() - t2
+
+    def _admit(self, m: Dict[str, Any]) -> Optional[int]:
+        epoch_us = _validate_message(m) * 1_000_000
+        # Filter out messages from the future (> now + 5s)
+        if epoch_us > self._future_limit_us:
+            return None
+        return epoch_us
+
+    def _fold(self, m: Dict[str, Any], epoch_us: int, features: Tuple[bool, bool, bool, str]) -> None:
+        user_id = m["user_id"]
+        is_emp, special, aware, label = features
+        flags = self.flags
+        if is_emp:
+            flags["mbras_employee"] = True
+        if special:
+            flags["special_pattern"] = True
+        if aware:
+            flags["candidate_awareness"] = True
+        else:
+            self.dist_counts[label] += 1
+
+        sign = _sentiment_sign(label)
+        hashtags = m.get("hashtags", [])
+        if hashtags:
+            # The anchor is fixed, so each occurrence's decayed weight is final on arrival
+            multiplier = _SENTIMENT_MULTIPLIER[sign]
+            age_us = self._anchor_us - epoch_us
+            for h in hashtags:
+                tag = h.lower()
+                self.trending.add(tag, _hashtag_weight(tag, age_us, multiplier), multiplier)
+
+        epoch = epoch_us // 1_000_000
+        reactions, shares, views = m.get("reactions", 0), m.get("shares", 0), m.get("views", 0)
+        idx = self.store.append(epoch, user_id, sign, reactions, shares, views)
+        if self._window_start_us <= epoch_us <= self._anchor_us:
+            self._window_totals[0] += reactions + shares
+            self._window_totals[1] += views
+        second_totals = self._second_totals
+        if second_totals is not None and epoch_us <= self._anchor_us:
+            totals = second_totals.get(epoch)
+            if totals is None:
+                second_totals[epoch] = [reactions + shares, views]
+            else:
+                totals[0] += reactions + shares
+                totals[1] += views
+        detector = self._detector
+        if detector is not None:
+            if detector.count and epoch < detector.max_ts:
+                self._detector = None
+            else:
+                detector.observe(idx, epoch, sign)
+
+    def result(self) -> Dict[str, Any]:
+        store = self.store
+        recorder = self._recorder
+        start = time.perf_counter() if recorder is not None else 0.0
+        distribution = _sentiment_distribution(self.dist_counts, sum(self.dist_counts.values()))
+        engagement = _engagement_score(*self._window_totals, self.flags["candidate_awareness"])
+        if recorder is not None:
+            # Per-message folding and the final aggregates are one "aggregation" observation
+            self._timings[2] += time.perf_counter() - start
+            for name, seconds in zip(("validation", "sentiment", "aggregation"), self._timings):
+                if seconds:
+                    recorder.stage(name, seconds)
+            recorder.feed(len(store))
+        with _stage("trending"):
+            trending_topics = [tag for tag, _, _ in self.trending.top(5)]
+        with _stage("influence"):
+            influence = _influence_ranking(store)
+        with _stage("anomalies"):
+            anomalies = self._detector.result() if self._detector is not None else _detect_anomalies(store)
+        result = _build_result(distribution, engagement, trending_topics, influence, anomalies, dict(self.flags))
+        if isinstance(self.trending, SpaceSavingTrending):
+            result["analysis"]["trending_error_bound"] = round(self.trending.error_bound(), 4)
+        return result
+
+    def window_results(self, windows: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        # result() once for time_window_minutes; only engagement_score depends on the window
+        # (trending decays by exact age against the anchor), so the other windows reuse it.
+        # Each other window must have been passed to the constructor.
+        windows = list(dict.fromkeys(windows))
+        for w in windows:
+            if not isinstance(w, int) or w <= 0:
+                raise _build_error("'time_window_minutes' deve ser > 0", code="INVALID_TIME_WINDOW")
+            if w != self.time_window_minutes and w not in self._windows:
+                raise ValueError(f"window {w} was not passed to FeedAccumulator")
+        base = self.result()
+        others = [w for w in windows if w != self.time_window_minutes]
+        scores = _engagement_by_window(self._second_totals or {}, self.anchor, others, self.flags["candidate_awareness"])
+        results = {}
+        for w in windows:
+            if w == self.time_window_minutes:
+                results[w] = base
+            else:
+                results[w] = {**base, "analysis": {**base["analysis"], "engagement_score": scores[w]}}
+        return results
+
+
+def _add_parallel(acc: FeedAccumulator, messages: Iterable[Dict[str, Any]]) -> None:
+    # Validation stays here and in order, so the first invalid message fails exactly as in
+    # the serial path; chunks are scored by the pool while the rest is still being validated
+    # and folded back in the original order. At most two chunks per worker are in flight,
+    # so only those messages are held on top of the store, whatever the input size.
+    in_flight: "deque[Tuple[Any, List[Tuple[Dict[str, Any], int]]]]" = deque()
+    max_in_flight = 2 * _pool_workers
+    admitted: List[Tuple[Dict[str, Any], int]] = []
+    chunk: List[Tuple[str, str]] = []
+
+    def fold_oldest() -> None:
+        future, batch = in_flight.popleft()
+        for (m, epoch_us), features in zip(batch, future.result()):
+            acc._fold(m, epoch_us, features)
+
+    try:
+        for m in messages:
+            epoch_us = acc._admit(m)
+            if epoch_us is None:
+                continue
+            admitted.append((m, epoch_us))
+            chunk.append((m["user_id"], m["content"]))
+            if len(chunk) == PARALLEL_CHUNK_SIZE:
+                in_flight.append((_pool.submit(_score_chunk, chunk), admitted))
+                admitted, chunk = [], []
+                if len(in_flight) > max_in_flight:
+                    fold_oldest()
+    except ValidationError:
+        for future, _ in in_flight:
+            future.cancel()
+        raise
+    if chunk:
+        in_flight.append((_pool.submit(_score_chunk, chunk), admitted))
+    while in_flight:
+        fold_oldest()
+
+
+def analyze_feed(
+    messages: Iterable[Dict[str, Any]],
+    time_window_minutes: int,
+    now_utc: datetime,
+    trending_capacity: Optional[int] = None,
+) -> Dict[str, Any]:
+    # Single traversal: validation, future filter, flags and sentiment run per message;
+    # the remaining stages read the compact MessageStore columns.
+    acc = FeedAccumulator(time_window_minutes, now_utc, trending_capacity)
+    _ingest(acc, messages)
+    return acc.result()
+
+
+def _ingest(acc: FeedAccumulator, messages: Iterable[Dict[str, Any]]) -> None:
+    if _pool is not None and isinstance(messages, list) and len(messages) >= PARALLEL_MIN_MESSAGES:
+        # Validation, scoring and folding overlap here; the whole ingestion counts as sentiment
+        with _stage("sentiment"):
+            _add_parallel(acc, messages)
+    else:
+        for m in messages:
+            acc.add(m)
+
+
+def analyze_feed_windows(
+    messages: Iterable[Dict[str, Any]],
+    time_windows_minutes: List[int],
+    now_utc: datetime,
+) -> Dict[int, Dict[str, Any]]:
+    # {window: analyze_feed(messages, window, now_utc)} from a single pass over the messages
+    if not time_windows_minutes:
+        raise _build_error("'time_windows_minutes' deve ter ao menos uma janela", code="INVALID_TIME_WINDOW")
+    acc = FeedAccumulator(time_windows_minutes[0], now_utc, windows=time_windows_minutes[1:])
+    _ingest(acc, messages)
+    return acc.window_results(time_windows_minutes)
+
+
+# Business rule of the API: this window is refused with 422 everywhere a window is accepted
+# (the HTTP endpoints and bulk_analyze.py)
+UNSUPPORTED_WINDOW_MINUTES = 123
+UNSUPPORTED_WINDOW_ERROR = {"error": "Valor de janela temporal não suportado na versão atual", "code": "UNSUPPORTED_TIME_WINDOW"}
+
+
+def answered_windows(time_windows_minutes: List[int]) -> List[int]:
+    # Extra windows that get an analysis; the others get the error the endpoint would answer
+    return [w for w in time_windows_minutes if w > 0 and w != UNSUPPORTED_WINDOW_MINUTES]
+
+
+def with_window_entries(
+    results: Dict[int, Dict[str, Any]],
+    time_window_minutes: int,
+    time_windows_minutes: List[int],
+) -> Dict[str, Any]:
+    # results[time_window_minutes] plus "windows": one entry per requested window, in request
+    # order. Windows the single-window endpoint would refuse get that status and error instead
+    # of failing the whole request.
+    entries = []
+    for w in time_windows_minutes:
+        if w == UNSUPPORTED_WINDOW_MINUTES:
+            entries.append({"time_window_minutes": w, "status": 422, **UNSUPPORTED_WINDOW_ERROR})
+        elif w <= 0:
+            entries.append({"time_window_minutes": w, "status": 400, "error": "'time_window_minutes' deve ser > 0", "code": "INVALID_TIME_WINDOW"})
+        else:
+            analysis = {k: v for k, v in results[w]["analysis"].items() if k != "processing_time_ms"}
+            entries.append({"time_window_minutes": w, "status": 200, "analysis": analysis})
+    result = results[time_window_minutes]
+    result["windows"] = entries
+    return result
+
+
+def analyze_with_windows(
+    messages: List[Dict[str, Any]],
+    time_window_minutes: int,
+    time_windows_minutes: List[int],
+    now_utc: datetime,
+) -> Dict[str, Any]:
+    # analyze_feed's result plus the "windows" entries, all from a single pass
+    results = analyze_feed_windows(messages, [time_window_minutes, *answered_windows(time_windows_minutes)], now_utc)
+    return with_window_entries(results, time_window_minutes, time_windows_minutes)
+
+
+def analyze_feed_stream(
+    messages: Iterable[Dict[str, Any]],
+    time_window_minutes: int,
+    now_utc: datetime,
+    trending_capacity: Optional[int] = None,
+) -> Dict[str, Any]:
+    # Same result as analyze_feed, for generators (e.g. NDJSON lines, bulk_analyze.py): the
+    # length is unknown up front, so with the scoring pool started the stream is always scored there
+    if _pool is None:
+        return analyze_feed(messages, time_window_minutes, now_utc, trending_capacity)
+    acc = FeedAccumulator(time_window_minutes, now_utc, trending_capacity)
+    with _stage("sentiment"):
+        _add_parallel(acc, messages)
+    return acc.result()
+
+
+def _analyze_feed_job(job: Tuple[Any, ...]) -> Tuple[Optional[Dict[str, Any]], Optional[Tuple[str, str]]]:
+    # (result, None) or (None, (error, code)); plain tuples cross the process boundary.
+    # A job with extra windows, (messages, window, now_utc, windows), gets {window: result}.
+    messages, time_window_minutes, now_utc = job[:3]
+    started = time.perf_counter()
+    try:
+        if len(job) > 3:
+            result = analyze_feed_windows(messages, [time_window_minutes, *job[3]], now_utc)
+            analysis = result[time_window_minutes]["analysis"]
+        else:
+            result = analyze_feed(messages, time_window_minutes, now_utc)
+            analysis = result["analysis"]
+    except ValidationError as e:
+        return None, (str(e), e.code)
+    analysis["processing_time_ms"] = int((time.perf_counter() - started) * 1000)
+    return result, None
+
+
+def analyze_feeds(
+    feeds: List[Tuple[Any, ...]],
+) -> List[Tuple[Optional[Dict[str, Any]], Optional[Tuple[str, str]]]]:
+    # Independent (messages, time_window_minutes, now_utc[, extra windows]) feeds, one outcome
+    # per feed in input order; a failing feed does not affect the others. With the scoring pool
+    # started the feeds run concurrently in its workers.
+    jobs = list(feeds)
+    if _pool is None or len(jobs) < 2:
+        return [_analyze_feed_job(job) for job in jobs]
+    chunksize = max(1, len(jobs) // (4 * _pool_workers))
+    return list(_pool.map(_analyze_feed_job, jobs, chunksize=chunksize))
+
+
+class _Entry:
+    __slots__ = ("epoch", "seq", "user_id", "sign", "label", "reactions", "shares", "views", "tags", "is_emp", "special", "aware")
+
+
+class _UserState:
+    __slots__ = ("reactions", "shares", "views", "timeline", "dirty")
+
+    def __init__(self) -> None:
+        self.reactions = self.shares = self.views = 0
+        self.timeline: List[Tuple[int, int, int]] = []  # active (epoch, seq, sign), chronological
+        self.dirty = False
+
+
+class IncrementalAnalyzer:
+    """Sliding-window analyzer: `add` new messages, `evict_before` old ones, `snapshot(now)`.
+
+    `snapshot(now)` returns what `analyze_feed` would return for the retained
+    messages (in the order they were added). Aggregates are updated per added
+    or evicted message; a snapshot costs O(users + hashtag groups + seconds in
+    the window + messages of users touched since the last snapshot).
+    Messages more than 5s ahead of `now` are kept aside and folded in once a
+    later snapshot reaches them. Hashtag weights are summed per
+    (second, sentiment) group, so they may differ from `analyze_feed` in the
+    last floating-point digit.
+    """
+
+    def __init__(self, time_window_minutes: int) -> None:
+        if not isinstance(time_window_minutes, int) or time_window_minutes <= 0:
+            raise _build_error("'time_window_minutes' deve ser > 0", code="INVALID_TIME_WINDOW")
+        self.time_window_minutes = time_window_minutes
+        self._seq = 0
+        self._retained = 0
+        self._by_second: Dict[int, List[_Entry]] = {}  # every retained message
+        self._seconds: List[int] = []  # sorted keys of _by_second
+        self._second_totals: Dict[int, List[int]] = {}  # second -> [interactions, views]
+        self._horizon: Optional[int] = None  # messages with epoch <= horizon are active
+        self._active = 0
+        self._flag_counts = [0, 0, 0]  # mbras_employee, special_pattern, candidate_awareness
+        self._dist_counts = {"positive": 0, "negative": 0, "neutral": 0}
+        self._users: Dict[str, _UserState] = {}
+        self._tags: Dict[str, Dict[Tuple[int, int], int]] = {}  # tag -> (epoch, sign) -> count
+        self._burst_users: set = set()
+        self._alternating_users: set = set()
+
+    def __len__(self) -> int:
+        return self._retained
+
+    def add(self, messages: Iterable[Dict[str, Any]]) -> None:
+        # The whole batch is validated before any of it is applied
+        batch = [(m, _validate_message(m)) for m in messages]
+        for m, epoch in batch:
+            e = _Entry()
+            e.epoch = epoch
+            e.seq = self._seq
+            self._seq += 1
+            e.user_id = m["user_id"]
+            e.is_emp, e.special, e.aware, e.label = _message_features(e.user_id, m["content"])
+            e.sign = _sentiment_sign(e.label)
+            e.reactions = m.get("reactions", 0)
+            e.shares = m.get("shares", 0)
+            e.views = m.get("views", 0)
+            e.tags = [h.lower() for h in m.get("hashtags", [])]
+
+            bucket = self._by_second.get(epoch)
+            if bucket is None:
+                bucket = self._by_second[epoch] = []
+                self._second_totals[epoch] = [0, 0]
+                bisect.insort(self._seconds, epoch)
+            bucket.append(e)
+            self._retained += 1
+            totals = self._second_totals[epoch]
+            totals[0] += e.reactions + e.shares
+            totals[1] += e.views
+            if self._horizon is not None and epoch <= self._horizon:
+                self._fold(e, +1)
+
+    def evict_before(self, ts: datetime) -> int:
+        # Drops every message older than `ts`; returns how many were removed
+        cut = bisect.bisect_left(self._seconds, -(-_epoch_us(ts) // 1_000_000))
+        removed = 0
+        for epoch in self._seconds[:cut]:
+            for e in self._by_second.pop(epoch):
+                if self._horizon is not None and epoch <= self._horizon:
+                    self._fold(e, -1)
+                removed += 1
+            del self._second_totals[epoch]
+        del self._seconds[:cut]
+        self._retained -= removed
+        return removed
+
+    def snapshot(self, now_utc: datetime) -> Dict[str, Any]:
+        anchor_us = _epoch_us(_window_anchor(now_utc))
+        self._move_horizon((anchor_us + 5_000_000) // 1_000_000)
+
+        flags = {
+            "mbras_employee": self._flag_counts[0] > 0,
+            "special_pattern": self._flag_counts[1] > 0,
+            "candidate_awareness": self._flag_counts[2] > 0,
+        }
+        return _build_result(
+            _sentiment_distribution(self._dist_counts, sum(self._dist_counts.values())),
+            self._engagement_score(anchor_us, flags["candidate_awareness"]),
+            self._trending(anchor_us),
+            _rank_users((u, st.reactions, st.shares, st.views) for u, st in self._users.items()),
+            self._anomaly(),
+            flags,
+        )
+
+    def _move_horizon(self, horizon: int) -> None:
+        old = self._horizon
+        self._horizon = horizon
+        seconds = self._seconds
+        if old is None:
+            lo, hi, direction = 0, bisect.bisect_right(seconds, horizon), +1
+        elif horizon >= old:
+            lo, hi, direction = bisect.bisect_right(seconds, old), bisect.bisect_right(seconds, horizon), +1
+        else:  # clock moved back: previously active messages are in the future again
+            lo, hi, direction = bisect.bisect_right(seconds, horizon), bisect.bisect_right(seconds, old), -1
+        for epoch in seconds[lo:hi]:
+            for e in self._by_second[epoch]:
+                self._fold(e, direction)
+
+    def _fold(self, e: _Entry, direction: int) -> None:
+        self._active += direction
+        self._flag_counts[0] += direction * e.is_emp
+        self._flag_counts[1] += direction * e.special
+        self._flag_counts[2] += direction * e.aware
+        if e.label != "meta":
+            self._dist_counts[e.label] += direction
+
+        st = self._users.get(e.user_id)
+        if st is None:
+            st = self._users[e.user_id] = _UserState()
+        st.reactions += direction * e.reactions
+        st.shares += direction * e.shares
+        st.views += direction * e.views
+        point = (e.epoch, e.seq, e.sign)
+        if direction > 0:
+            bisect.insort(st.timeline, point)
+        else:
+            del st.timeline[bisect.bisect_left(st.timeline, point)]
+        st.dirty = True
+        if not st.timeline:
+            del self._users[e.user_id]
+            self._burst_users.discard(e.user_id)
+            self._alternating_users.discard(e.user_id)
+
+        key = (e.epoch, e.sign)
+        for tag in e.tags:
+            groups = self._tags.setdefault(tag, {})
+            count = groups.get(key, 0) + direction
+            if count:
+                groups[key] = count
+            else:
+                del groups[key]
+                if not groups:
+                    del self._tags[tag]
+
+    def _engagement_score(self, anchor_us: int, candidate_awareness: bool) -> float:
+        if candidate_awareness:
+            return 9.42
+        start_us = anchor_us - self.time_window_minutes * 60_000_000
+        lo = bisect.bisect_left(self._seconds, -(-start_us // 1_000_000))
+        hi = bisect.bisect_right(self._seconds, anchor_us // 1_000_000)
+        interactions = views = 0
+        for epoch in self._seconds[lo:hi]:
+            i, v = self._second_totals[epoch]
+            interactions += i
+            views += v
+        return round(10.0 * (interactions / max(views, 1)), 2)
+
+    def _trending(self, anchor_us: int) -> List[str]:
+        tags = list(self._tags)
+        weights: List[float] = []
+        counts: List[int] = []
+        sentiment_weights: List[float] = []
+        for tag in tags:
+            w = c = sw = 0
+            for (epoch, sign), n in self._tags[tag].items():
+                multiplier = _SENTIMENT_MULTIPLIER[sign]
+                w += n * _hashtag_weight(tag, anchor_us - epoch * 1_000_000, multiplier)
+                c += n
+                sw += n * multiplier
+            weights.append(w)
+            counts.append(c)
+            sentiment_weights.append(sw)
+        return _top_tags(tags, weights, counts, sentiment_weights)
+
+    def _anomaly(self) -> Tuple[bool, Optional[str]]:
+        if not self._active:
+            return False, None
+        seconds = self._seconds
+        last = seconds[bisect.bisect_right(seconds, self._horizon) - 1]
+        # synchronized posting tolerant: at least 3 messages and all within ±2 seconds
+        if self._active >= 3 and last - seconds[0] <= 2:
+            return True, "synchronized_posting"
+
+        for user_id, st in self._users.items():
+            if not st.dirty:
+                continue
+            st.dirty = False
+            timeline = st.timeline
+            if _has_burst([p[0] for p in timeline]):
+                self._burst_users.add(user_id)
+            else:
+                self._burst_users.discard(user_id)
+            if _has_alternation(p[2] for p in timeline):
+                self._alternating_users.add(user_id)
+            else:
+                self._alternating_users.discard(user_id)
+        if self._burst_users:
+            return True, "burst"
+        if self._alternating_users:
+            return True, "alternating_sentiment"
+        return False, None
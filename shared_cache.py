@@ -0,0 +1,232 @@
+"""Cross-process cache of pure per-key results in a shared memory-mapped table.
+
+With several uvicorn workers each process warms its own LRU caches. Pointing
+``SHARED_CACHE_PATH`` at a file (ideally under /dev/shm) makes every worker on
+the host map the same table: a follower count or a message sentiment computed
+by one worker is read by all the others. The per-process LRU caches stay in
+front of it, so the table is only consulted on their misses.
+
+File layout (little-endian):
+    header  magic b"MBSHRC02", slots u32, insertion clock u32, pad to 32 bytes
+    buckets slots / WAYS buckets of WAYS slots;
+            slot = digest 16 bytes, insertion stamp u32, value 12 bytes;
+            an all-zero digest = empty
+
+The digest is a keyed BLAKE2b of the namespaced key. The BLAKE2b key is a hash of
+sentiment_analyzer.py itself, so processes running different code never read each
+other's entries. A key lives in one bucket, picked by its digest. A lookup copies
+the bucket with one slice and searches it; no lock is taken.
+
+Writes are buffered per process and stored in batches of WRITE_BATCH (or after
+WRITE_INTERVAL seconds) under a single POSIX record lock. Keys another worker
+already stored are skipped without locking. When a bucket is full, the entry
+inserted longest ago is replaced, so the table keeps taking new results after
+it fills up and across restarts. A writer first clears the slot's digest, then
+writes the value, then the new digest. A reader therefore re-checks the digest
+after copying the value and takes any change as a miss.
+"""
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import sentiment_analyzer
+
+MAGIC = b"MBSHRC02"
+_HEADER = struct.Struct("<8sII16x")
+_CLOCK = struct.Struct("<I")
+_CLOCK_OFFSET = 12
+WAYS = 8
+_SLOT_SIZE = 32
+_DIGEST_SIZE = 16
+_BUCKET_SIZE = WAYS * _SLOT_SIZE
+_EMPTY = bytes(_DIGEST_SIZE)
+_STAMP = struct.Struct("<I")
+_STAMPS = struct.Struct("<" + "16xI12x" * WAYS)
+WRITE_BATCH = 64
+WRITE_INTERVAL = 0.5
+
+_FOLLOWERS = struct.Struct("<q4x")
+_SENTIMENT = struct.Struct("<dB3x")
+_LABELS = ("positive", "negative", "neutral", "meta")
+_LABEL_INDEX = {label: i for i, label in enumerate(_LABELS)}
+
+# Serializes writers within a process; recreated in forked children (the scoring pool),
+# which could otherwise inherit it locked
+_thread_lock = threading.Lock()
+
+
+def _reset_thread_lock() -> None:
+    global _thread_lock
+    _thread_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_thread_lock)
+
+
+def _slot_of(bucket: bytes, digest: bytes) -> int:
+    # Offset of the slot holding digest, or -1; a match inside a value is not a key
+    pos = bucket.find(digest)
+    while pos % _SLOT_SIZE:
+        if pos == -1:
+            return -1
+        pos = bucket.find(digest, pos + 1)
+    return pos
+
+
+def _code_key() -> bytes:
+    with open(sentiment_analyzer.__file__, "rb") as f:
+        return hashlib.blake2b(f.read(), digest_size=32).digest()
+
+
+class SharedCache:
+    def __init__(self, path: str, capacity: int = 1 << 18) -> None:
+        # capacity: slots, a power of two of at least WAYS
+        if capacity & (capacity - 1) or capacity < WAYS:
+            raise ValueError(f"capacity must be a power of two >= {WAYS}")
+        self._file = os.fdopen(os.open(path, os.O_RDWR | os.O_CREAT, 0o600), "r+b")
+        fcntl.lockf(self._file, fcntl.LOCK_EX)
+        try:
+            size = os.fstat(self._file.fileno()).st_size
+            if size == 0:
+                self._file.truncate(_HEADER.size + capacity * _SLOT_SIZE)
+                self._file.seek(0)
+                self._file.write(_HEADER.pack(MAGIC, capacity, 0))
+                self._file.flush()
+            self._mm = mmap.mmap(self._file.fileno(), 0)
+        finally:
+            fcntl.lockf(self._file, fcntl.LOCK_UN)
+        magic, self.capacity, _ = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or len(self._mm) != _HEADER.size + self.capacity * _SLOT_SIZE:
+            self.close()
+            raise ValueError(f"{path}: not a shared cache file of this version")
+        self._key = _code_key()
+        self._bucket_mask = self.capacity // WAYS - 1
+        self._pending: Dict[bytes, bytes] = {}  # digest -> value, not yet in the table
+        self._pending_since = 0.0
+        self._last_miss: Tuple[bytes, bytes] = (b"", b"")  # (key, digest): put follows get
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _digest(self, key: bytes) -> bytes:
+        return hashlib.blake2b(key, digest_size=_DIGEST_SIZE, key=self._key).digest()
+
+    def _bucket(self, digest: bytes) -> int:
+        return _HEADER.size + (int.from_bytes(digest[:8], "little") & self._bucket_mask) * _BUCKET_SIZE
+
+    def _find(self, digest: bytes) -> Optional[bytes]:
+        offset = self._bucket(digest)
+        mm = self._mm
+        bucket = mm[offset:offset + _BUCKET_SIZE]
+        pos = _slot_of(bucket, digest)
+        # A writer may have replaced the slot while it was copied
+        if pos == -1 or mm[offset + pos:offset + pos + _DIGEST_SIZE] != digest:
+            return None
+        return bucket[pos + _DIGEST_SIZE + _STAMP.size:pos + _SLOT_SIZE]
+
+    def _get(self, key: bytes) -> Optional[bytes]:
+        digest = self._digest(key)
+        value = self._find(digest)
+        if value is None:
+            self.misses += 1
+            self._last_miss = (key, digest)
+        else:
+            self.hits += 1
+        return value
+
+    def _put(self, key: bytes, value: bytes) -> None:
+        last_key, digest = self._last_miss
+        if last_key != key:
+            digest = self._digest(key)
+        with _thread_lock:
+            if not self._pending:
+                self._pending_since = time.monotonic()
+            self._pending[digest] = value
+            if len(self._pending) >= WRITE_BATCH or time.monotonic() - self._pending_since >= WRITE_INTERVAL:
+                self._flush_locked()
+
+    def flush(self) -> None:
+        with _thread_lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        pending, self._pending = self._pending, {}
+        # Keys another worker stored meanwhile need no file lock. One that is stored
+        # between this check and the lock ends up in two slots of its bucket: values
+        # are pure, so the copy is only a wasted slot until it ages out.
+        todo = [(self._bucket(digest), digest, value) for digest, value in pending.items() if self._find(digest) is None]
+        if not todo:
+            return
+        mm = self._mm
+        fcntl.lockf(self._file, fcntl.LOCK_EX)
+        try:
+            clock = _CLOCK.unpack_from(mm, _CLOCK_OFFSET)[0]
+            for offset, digest, value in todo:
+                bucket = mm[offset:offset + _BUCKET_SIZE]
+                # Slots fill in order and are never emptied, so the first empty one ends the bucket
+                pos = _slot_of(bucket, _EMPTY)
+                if pos == -1:
+                    # Oldest insertion; when the clock wraps (every 2**32 inserts) the
+                    # newest entries are taken for the oldest once, which costs a few misses
+                    stamps = _STAMPS.unpack(bucket)
+                    pos = stamps.index(min(stamps)) * _SLOT_SIZE
+                    self.evictions += 1
+                    pos += offset
+                    mm[pos:pos + _DIGEST_SIZE] = _EMPTY  # readers of the old entry now miss
+                else:
+                    pos += offset
+                mm[pos + _DIGEST_SIZE:pos + _SLOT_SIZE] = _STAMP.pack(clock) + value
+                mm[pos:pos + _DIGEST_SIZE] = digest
+                clock = (clock + 1) & 0xFFFFFFFF
+            _CLOCK.pack_into(mm, _CLOCK_OFFSET, clock)
+        finally:
+            fcntl.lockf(self._file, fcntl.LOCK_UN)
+
+    def get_followers(self, user_id: str) -> Optional[int]:
+        value = self._get(b"f" + user_id.encode("utf-8", "surrogatepass"))
+        return None if value is None else _FOLLOWERS.unpack(value)[0]
+
+    def put_followers(self, user_id: str, followers: int) -> None:
+        self._put(b"f" + user_id.encode("utf-8", "surrogatepass"), _FOLLOWERS.pack(followers))
+
+    def get_sentiment(self, lexicon: bytes, content: str, is_mbras_emp: bool) -> Optional[Tuple[float, str]]:
+        value = self._get(b"s" + lexicon + (b"1" if is_mbras_emp else b"0") + content.encode("utf-8", "surrogatepass"))
+        if value is None:
+            return None
+        score, label = _SENTIMENT.unpack(value)
+        return score, _LABELS[label]
+
+    def put_sentiment(self, lexicon: bytes, content: str, is_mbras_emp: bool, result: Tuple[float, str]) -> None:
+        key = b"s" + lexicon + (b"1" if is_mbras_emp else b"0") + content.encode("utf-8", "surrogatepass")
+        self._put(key, _SENTIMENT.pack(result[0], _LABEL_INDEX[result[1]]))
+
+    def entries(self) -> int:
+        # Full scan: for stats and tests, not the request path
+        mm = self._mm
+        return sum(
+            mm[offset:offset + _DIGEST_SIZE] != _EMPTY
+            for offset in range(_HEADER.size, len(mm), _SLOT_SIZE)
+        )
+
+    def stats(self) -> Dict[str, int]:
+        # hits/misses/evictions/pending are this process's; capacity is shared
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "pending": len(self._pending),
+            "capacity": self.capacity,
+        }
+
+    def close(self) -> None:
+        if not self._mm.closed:
+            self.flush()
+            self._mm.close()
+        self._file.close()
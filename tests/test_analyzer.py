@@ -378,3 +378,974 @@ def test_long_hashtag_logarithmic_decay():
     r = post_analyze(payload)
     assert r.status_code == 200
     # Long hashtag should have reduced weight due to logarithmic factor
+
+
+def post_stream(messages, time_window_minutes=30, content_type="application/x-ndjson"):
+    body = "\n".join(json.dumps(m, ensure_ascii=False) for m in messages) + "\n"
+    return client.post(
+        f"/analyze-feed/stream?time_window_minutes={time_window_minutes}",
+        content=body.encode("utf-8"),
+        headers={"Content-Type": content_type},
+    )
+
+
+def test_stream_matches_json_endpoint():
+    with open("examples/edge_cases.json", encoding="utf-8") as f:
+        payload = json.load(f)
+    r_json = post_analyze(payload)
+    r_stream = post_stream(payload["messages"], payload["time_window_minutes"])
+    assert r_json.status_code == r_stream.status_code == 200
+    a_json = r_json.json()["analysis"]
+    a_stream = r_stream.json()["analysis"]
+    a_json.pop("processing_time_ms")
+    a_stream.pop("processing_time_ms")
+    assert a_stream == a_json
+
+
+def test_stream_is_folded_in_batches_on_the_executor(monkeypatch):
+    import main
+
+    monkeypatch.setattr(main, "STREAM_BATCH_LINES", 2)
+    with open("examples/edge_cases.json", encoding="utf-8") as f:
+        payload = json.load(f)
+    expected = post_analyze(payload).json()["analysis"]
+    r = post_stream(payload["messages"], payload["time_window_minutes"])
+    assert r.status_code == 200
+    assert r.headers["server-timing"].startswith("queue;dur=")
+    analysis = r.json()["analysis"]
+    analysis.pop("processing_time_ms")
+    expected.pop("processing_time_ms")
+    assert analysis == expected
+
+    # Line numbers in 422 errors keep counting across batches
+    messages = payload["messages"][:3] + [{"id": "x"}]
+    r = post_stream(messages)
+    assert r.status_code == 422
+    assert r.json()["detail"][0]["loc"][:2] == ["body", 3]
+
+
+def test_ndjson_lines_rejoins_lines_split_across_chunks():
+    import asyncio
+    import main
+
+    async def chunks(body, size):
+        for i in range(0, len(body), size):
+            yield body[i:i + size]
+
+    async def collect(body, size):
+        return [line async for line in main._ndjson_lines(chunks(body, size))]
+
+    long_line = b'{"content": "' + b"x" * 5000 + b'"}'
+    body = b'{"a": 1}\n\n' + long_line + b"\n  \n" + b'{"b": 2}'
+    expected = [b'{"a": 1}', long_line, b'{"b": 2}']
+    for size in (1, 3, 64, len(body)):
+        assert asyncio.run(collect(body, size)) == expected
+    assert asyncio.run(collect(body + b"\n", 7)) == expected
+
+
+def test_stream_errors_match_json_endpoint():
+    msg = {
+        "id": "msg_bad",
+        "content": "Adorei",
+        "timestamp": "2025-09-10T10:00:00",  # missing 'Z'
+        "user_id": "user_123",
+    }
+    r = post_stream([msg])
+    assert r.status_code == 400
+    assert r.json()["code"] == "INVALID_TIMESTAMP"
+
+    r = post_stream([msg], time_window_minutes=123)
+    assert r.status_code == 422
+    assert r.json()["code"] == "UNSUPPORTED_TIME_WINDOW"
+
+    r = post_stream([msg], content_type="application/json")
+    assert r.status_code == 400
+    assert r.json()["code"] == "INVALID_CONTENT_TYPE"
+
+
+def test_analyze_feed_leaves_input_untouched():
+    from sentiment_analyzer import analyze_feed
+
+    with open("examples/sample_request.json", encoding="utf-8") as f:
+        payload = json.load(f)
+    before = json.dumps(payload, sort_keys=True)
+    now = datetime(2025, 9, 10, 11, 0, 0, tzinfo=timezone.utc)
+    analyze_feed(payload["messages"], payload["time_window_minutes"], now)
+    assert json.dumps(payload, sort_keys=True) == before
+
+
+def test_numpy_backend_matches_python(monkeypatch):
+    import pytest
+    import sentiment_analyzer as sa
+
+    if sa.np is None:
+        pytest.skip("NumPy not installed")
+    from examples.generate_performance_data import generate
+
+    msgs = generate(3000)["messages"]
+    msgs += [dict(m, user_id=u) for m, u in zip(msgs, ["user_mbras_1", "user_x007", "user_13chars", "user_math_prime"])]
+    now = datetime(2025, 9, 10, 11, 0, 0, tzinfo=timezone.utc)
+
+    monkeypatch.setattr(sa, "NUMPY_MIN_USERS", 10**9)
+    expected = sa.analyze_feed(msgs, 30, now)
+    monkeypatch.setattr(sa, "NUMPY_MIN_USERS", 0)
+    acc = sa.FeedAccumulator(30, now)
+    for m in msgs:
+        acc.add(m)
+    assert sa._numpy_user_totals(acc.store) is not None
+    assert acc.result() == expected
+
+    # The backend is chosen by distinct users, not messages
+    monkeypatch.undo()
+    acc = sa.FeedAccumulator(30, now)
+    for m in msgs * 3:
+        acc.add(dict(m, user_id=m["user_id"][:6] + "_a"))
+    assert len(acc.store) > sa.NUMPY_MIN_MESSAGES and sa._numpy_user_totals(acc.store) is None
+
+
+def test_accumulator_folds_totals_on_arrival():
+    import pytest
+    import sentiment_analyzer as sa
+
+    now = datetime(2025, 9, 10, 11, 0, 0, tzinfo=timezone.utc)
+    msgs = [
+        {
+            "id": f"m{i}",
+            "content": "adorei" if i % 3 else "péssimo",
+            "timestamp": f"2025-09-10T{10 - i // 600:02d}:{i // 20 % 60:02d}:{i % 10:02d}Z",
+            "user_id": f"user_{i % 3:03d}",
+            "hashtags": ["#A", "#b"] if i % 2 else ["#a"],
+            "reactions": i % 7,
+            "shares": 1,
+            "views": 10,
+        }
+        for i in range(1200)
+    ]
+    acc = sa.FeedAccumulator(30, now, windows=[60, 240])
+    for m in msgs:
+        acc.add(m)
+    # Per user, per tag and per second, not per message; only the anomaly columns grow with the feed
+    assert len(acc.store.user_reactions) == 3 and acc.trending.tags == ["#a", "#b"]
+    assert acc.store.__slots__ == ("epochs", "user_idx", "signs", "users", "user_reactions", "user_shares", "user_views", "_user_index")
+    assert len(acc._second_totals) == 600 and len(acc.store) == 1200
+    assert acc._detector is None  # out of order: the anomaly pass runs over the store
+    results = acc.window_results([30, 60, 240])
+    assert results == {w: sa.analyze_feed(msgs, w, now) for w in (30, 60, 240)}
+    with pytest.raises(ValueError):
+        acc.window_results([15])
+
+
+def test_normalization_cache_and_ascii_fast_path():
+    from sentiment_analyzer import _fold_accents, _strip_accents_lower, normalization_cache_info
+
+    for token in ["Adorei", "NÃO", "péssimo", "user_café", "ﬁm", "#Produto"]:
+        assert _strip_accents_lower(token) == _fold_accents(token)
+
+    before = normalization_cache_info()
+    _strip_accents_lower("Terrível")
+    _strip_accents_lower("Terrível")
+    after = normalization_cache_info()
+    assert after["hits"] >= before["hits"] + 1
+    assert after["size"] <= after["maxsize"]
+
+
+def test_followers_table_lookup(tmp_path):
+    import sentiment_analyzer as sa
+    from followers_table import FollowersTable, build_followers_table
+
+    users = ["user_123", "user_café", "user_13chars", "user_math_prime", "user_mbras_007"]
+    path = str(tmp_path / "followers.tbl")
+    assert build_followers_table(users, path) == len(users)
+
+    table = FollowersTable(path)
+    try:
+        for u in users:
+            assert table.get(u) == sa._simulate_followers(u)
+        assert table.get("user_unknown") is None
+
+        sa.set_followers_table(table)
+        assert [sa._followers_simulation(u) for u in users + ["user_unknown"]] == [
+            sa._simulate_followers(u) for u in users + ["user_unknown"]
+        ]
+    finally:
+        sa.set_followers_table(None)
+        table.close()
+
+
+def test_lexicon_file_multiword_expressions():
+    import sentiment_analyzer as sa
+
+    lexicon = sa.Lexicon.from_file("examples/lexicon_pt.tsv")
+    sa.set_lexicon(lexicon)
+    try:
+        # "nada mal" is a single positive unit; "não vale a pena" outranks "não" + "vale a pena"
+        assert sa._sentiment_for_message("nada mal esse produto", False)[1] == "positive"
+        assert sa._sentiment_for_message("o atendimento deixa a desejar", False)[1] == "negative"
+        assert sa._sentiment_for_message("não vale a pena", False)[1] == "negative"
+        # Precedence is unchanged for single words: intensifier → negation → MBRAS
+        assert sa._sentiment_for_message("Não muito bom", False) == (-0.5, "negative")
+        assert sa._sentiment_for_message("Super adorei!", True) == (1.5, "positive")
+    finally:
+        sa.set_lexicon(None)
+    assert sa._sentiment_for_message("nada mal", False)[1] == "neutral"
+
+
+def test_session_deltas_match_full_feed():
+    from datetime import timedelta
+
+    now = datetime.now(timezone.utc)
+
+    def msg(i, minutes_ago, content, user):
+        ts = (now - timedelta(minutes=minutes_ago)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        return {"id": f"s{i}", "content": content, "timestamp": ts, "user_id": user,
+                "hashtags": ["#produto"] if i % 2 else ["#teste"], "reactions": i, "shares": 1, "views": 10 * (i + 1)}
+
+    first = [msg(i, 20 - i, "Adorei o produto!" if i % 3 else "ruim", f"user_{i % 3:03d}") for i in range(6)]
+    delta = [msg(6 + i, 2, "não gostei", "user_mbras_1") for i in range(2)]
+
+    r1 = client.post("/analyze-feed/session", json={"messages": first, "time_window_minutes": 30})
+    assert r1.status_code == 200
+    session_id = r1.json()["session_id"]
+    r2 = client.post("/analyze-feed/session", json={"session_id": session_id, "messages": delta, "time_window_minutes": 30})
+    assert r2.status_code == 200
+    full = post_analyze({"messages": first + delta, "time_window_minutes": 30})
+
+    a_session = r2.json()["analysis"]
+    a_full = full.json()["analysis"]
+    a_session.pop("processing_time_ms")
+    a_full.pop("processing_time_ms")
+    assert a_session == a_full
+
+    r = client.post("/analyze-feed/session", json={"session_id": "nope", "messages": [], "time_window_minutes": 30})
+    assert r.status_code == 404
+    assert r.json()["code"] == "SESSION_NOT_FOUND"
+
+
+def test_incremental_analyzer_evicts_and_matches_analyze_feed():
+    from datetime import timedelta
+    from sentiment_analyzer import IncrementalAnalyzer, analyze_feed
+    from examples.generate_performance_data import generate
+
+    msgs = generate(400)["messages"]
+    now = datetime(2025, 9, 10, 11, 0, 0, tzinfo=timezone.utc)
+    inc = IncrementalAnalyzer(30)
+    inc.add(msgs[:250])
+    inc.snapshot(now)
+    inc.add(msgs[250:])
+    cut = now - timedelta(minutes=20)
+    removed = inc.evict_before(cut)
+    kept = [m for m in msgs if m["timestamp"] >= cut.strftime("%Y-%m-%dT%H:%M:%SZ")]
+    assert removed == len(msgs) - len(kept) == len(msgs) - len(inc)
+    assert inc.snapshot(now) == analyze_feed(kept, 30, now)
+
+
+def test_space_saving_trending_sketch():
+    from sentiment_analyzer import SpaceSavingTrending
+
+    # Exact while distinct tags fit in the sketch
+    sketch = SpaceSavingTrending(8)
+    for tag, weight in [("#a", 3.0), ("#b", 1.0), ("#a", 2.0), ("#c", 4.0)]:
+        sketch.add(tag, weight, 1.0)
+    assert sketch.top(2) == [("#a", 5.0, 0.0), ("#c", 4.0, 0.0)]
+    assert sketch.error_bound() == 0.0
+
+    # Heavy hitters survive a long tail of one-off tags, within the reported bound
+    sketch = SpaceSavingTrending(16)
+    for i in range(2000):
+        sketch.add(f"#tail{i}", 1.0, 1.0)
+        if i % 10 == 0:
+            sketch.add("#hot", 5.0, 1.2)
+    top = sketch.top(5)
+    assert top[0][0] == "#hot"
+    assert top[0][1] - top[0][2] <= 1000.0 <= top[0][1]
+    assert sketch.error_bound() >= top[-1][2]
+    assert len(sketch.counters) == 16
+
+
+def test_stream_trending_capacity():
+    with open("examples/sample_request.json", encoding="utf-8") as f:
+        payload = json.load(f)
+    exact = post_stream(payload["messages"]).json()["analysis"]
+    r = client.post(
+        "/analyze-feed/stream?time_window_minutes=30&trending_capacity=16",
+        content="\n".join(json.dumps(m) for m in payload["messages"]).encode(),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    sketched = r.json()["analysis"]
+    assert sketched["trending_topics"] == exact["trending_topics"]
+    assert sketched["trending_error_bound"] == 0.0
+
+
+def test_anomaly_state_machines_any_order():
+    from datetime import timedelta
+    from sentiment_analyzer import analyze_feed
+
+    now = datetime(2025, 9, 10, 11, 0, 0, tzinfo=timezone.utc)
+
+    def feed(n, step_seconds, contents, user="user_anomaly"):
+        return [{
+            "id": f"a{i}", "content": contents[i % len(contents)],
+            "timestamp": (now - timedelta(seconds=step_seconds * (n - i))).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "user_id": user, "hashtags": [], "reactions": 0, "shares": 0, "views": 1,
+        } for i in range(n)]
+
+    cases = [
+        (feed(11, 20, ["ok"]), "burst"),
+        (feed(10, 20, ["ok"]), None),
+        (feed(10, 60, ["adorei", "ruim"]), "alternating_sentiment"),
+        (feed(10, 60, ["adorei", "ruim", "ok"]), None),
+        (feed(3, 0, ["ok"]) + feed(1, 2, ["ok"], user="user_other"), "synchronized_posting"),
+    ]
+    for msgs, expected in cases:
+        # Chronological input is detected on arrival; reversed input takes the sorted pass
+        for ordered in (msgs, msgs[::-1]):
+            analysis = analyze_feed(ordered, 30, now)["analysis"]
+            assert analysis["anomaly_type"] == expected
+            assert analysis["anomaly_detected"] is (expected is not None)
+
+
+def test_parallel_scoring_matches_serial(monkeypatch):
+    import pytest
+    import sentiment_analyzer as sa
+    from examples.generate_performance_data import generate
+
+    msgs = generate(500)["messages"]
+    msgs += [dict(m, user_id="user_mbras_9", content=c) for m, c in zip(msgs, ["não muito bom", "teste técnico mbras", "x" * 37 + "mbras"])]
+    now = datetime(2025, 9, 10, 11, 0, 0, tzinfo=timezone.utc)
+    expected = sa.analyze_feed(msgs, 30, now)
+
+    monkeypatch.setattr(sa, "PARALLEL_MIN_MESSAGES", 1)
+    monkeypatch.setattr(sa, "PARALLEL_CHUNK_SIZE", 64)
+    sa.start_scoring_pool(2)
+    try:
+        assert sa.analyze_feed(msgs, 30, now) == expected
+        bad = msgs[:300] + [dict(msgs[0], user_id="invalid")] + msgs[300:]
+        with pytest.raises(sa.ValidationError):
+            sa.analyze_feed(bad, 30, now)
+    finally:
+        sa.stop_scoring_pool()
+
+
+def test_analyze_feeds_batch_reports_errors_per_feed():
+    with open("examples/sample_request.json", encoding="utf-8") as f:
+        good = json.load(f)
+    bad_message = dict(good["messages"][0], user_id="invalid")
+    feeds = [
+        good,
+        {"messages": [bad_message], "time_window_minutes": 30},
+        {"messages": good["messages"], "time_window_minutes": 123},
+        {"messages": "nope", "time_window_minutes": 30},
+        dict(good, time_window_minutes=5),
+    ]
+    resp = client.post("/analyze-feeds", json={"feeds": feeds})
+    assert resp.status_code == 200
+    results = resp.json()["results"]
+    assert [r["status"] for r in results] == [200, 400, 422, 422, 200]
+
+    for i in (0, 4):
+        single = post_analyze(feeds[i]).json()
+        results[i]["analysis"].pop("processing_time_ms")
+        single["analysis"].pop("processing_time_ms")
+        assert results[i]["analysis"] == single["analysis"]
+    assert results[1]["code"] == post_analyze(feeds[1]).json()["code"] == "INVALID_USER_ID"
+    assert results[2]["code"] == "UNSUPPORTED_TIME_WINDOW"
+    assert set(results[3]) == {"status", "error", "code"}
+
+
+def test_analyze_feeds_spreads_over_executor_threads_and_honors_windows(monkeypatch):
+    import main
+    import sentiment_analyzer as sa
+
+    with open("examples/sample_request.json", encoding="utf-8") as f:
+        good = dict(json.load(f), reference_time="2025-09-10T11:00:00Z")
+    slices = []
+    analyze_feeds = sa.analyze_feeds
+
+    def recording(jobs):
+        slices.append(len(jobs))
+        return analyze_feeds(jobs)
+
+    feeds = [dict(good, time_window_minutes=w) for w in (5, 15, 30, 60, 240, 10, 20, 40)]
+    feeds[2] = dict(good, time_windows_minutes=[5, 123, 240])
+    monkeypatch.setattr(main, "analyze_feeds", recording)
+    results = client.post("/analyze-feeds", json={"feeds": feeds}).json()["results"]
+    assert slices == [2] * main.ANALYSIS_EXECUTOR.workers
+    for feed, result in zip(feeds, results):
+        single = post_analyze(feed).json()
+        single["analysis"].pop("processing_time_ms")
+        assert result.pop("status") == 200
+        result["analysis"].pop("processing_time_ms")
+        assert result == single
+    assert [e["status"] for e in results[2]["windows"]] == [200, 422, 200]
+
+
+def test_metrics_endpoint_reports_stage_histograms():
+    import metrics
+
+    recorder = metrics.enable()
+    try:
+        with open("examples/sample_request.json", encoding="utf-8") as f:
+            payload = json.load(f)
+        before = recorder.messages.count
+        assert post_analyze(payload).status_code == 200
+        assert recorder.messages.count == before + 1
+    finally:
+        metrics.disable()
+
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+    body = resp.text
+    assert "# TYPE analyze_feed_stage_seconds histogram" in body
+    for stage in metrics.STAGES:
+        count = next(line for line in body.splitlines() if line.startswith(f'analyze_feed_stage_seconds_count{{stage="{stage}"}}'))
+        assert int(count.split()[-1]) >= 1
+    assert f'analyze_feed_messages_bucket{{le="+Inf"}} {recorder.messages.count}' in body
+
+
+def test_histogram_buckets_are_cumulative_and_upper_inclusive():
+    from metrics import Histogram
+
+    hist = Histogram([1, 10])
+    for value in (0.5, 1, 5, 50):
+        hist.observe(value)
+    assert hist.cumulative() == [("1", 2), ("10", 3), ("+Inf", 4)]
+    assert hist.sum == 56.5 and hist.count == 4
+
+
+def test_profiling_requires_allowlisted_key(monkeypatch, tmp_path):
+    import cProfile
+    import tracemalloc
+    from concurrent.futures import ThreadPoolExecutor
+    import main
+    import profiling
+
+    def no_tracing_here(*args):
+        raise AssertionError("profiler started in the server process")
+
+    monkeypatch.setattr(tracemalloc, "start", no_tracing_here)
+    monkeypatch.setattr(cProfile.Profile, "enable", no_tracing_here)
+
+    with open("examples/sample_request.json", encoding="utf-8") as f:
+        payload = json.load(f)
+    plain = post_analyze(payload).json()
+    assert "profile" not in plain
+
+    denied = client.post("/analyze-feed", json=payload, headers={"X-Profile-Key": "k1"})
+    assert denied.status_code == 403
+    assert denied.json()["code"] == "PROFILING_NOT_ALLOWED"
+
+    monkeypatch.setattr(main, "PROFILE_KEYS", frozenset({"k1"}))
+    resp = client.post("/analyze-feed", json=payload, headers={"X-Profile-Key": "k1"})
+    assert resp.status_code == 200
+    body = resp.json()
+    report = body.pop("profile")
+    assert report["top_functions"] and report["allocations_by_line"]
+    assert report["peak_memory_kb"] > 0
+    body["analysis"].pop("processing_time_ms")
+    plain["analysis"].pop("processing_time_ms")
+    assert body == plain
+
+    monkeypatch.setattr(main, "PROFILE_DIR", str(tmp_path))
+    resp = client.post("/analyze-feed", json=payload, headers={"X-Profile-Key": "k1"})
+    assert "profile" not in resp.json()
+    with open(resp.headers["X-Profile-Report"], encoding="utf-8") as f:
+        assert json.load(f)["messages"] == len(payload["messages"])
+
+    # Concurrent profiles queue in the worker instead of colliding on the process-wide profiler
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        codes = list(pool.map(lambda _: client.post("/analyze-feed", json=payload, headers={"X-Profile-Key": "k1"}).status_code, range(3)))
+    assert codes == [200, 200, 200]
+    profiling.stop_tracer()
+
+
+def test_context_instrumentation_stays_in_its_thread():
+    import threading
+    import sentiment_analyzer as sa
+
+    class Recorder:
+        def stage(self, name, seconds):
+            pass
+
+        def feed(self, messages):
+            pass
+
+    recorder = Recorder()
+    now = datetime(2025, 9, 10, 11, 0, tzinfo=timezone.utc)
+    seen = {}
+    entered, release = threading.Event(), threading.Event()
+
+    def profiled():
+        with sa.instrumented(recorder):
+            seen["profiled"] = sa.FeedAccumulator(30, now)._recorder
+            entered.set()
+            release.wait(5)
+        seen["after"] = sa.FeedAccumulator(30, now)._recorder
+
+    thread = threading.Thread(target=profiled)
+    thread.start()
+    entered.wait(5)
+    seen["other"] = sa.FeedAccumulator(30, now)._recorder
+    release.set()
+    thread.join()
+    assert seen == {"profiled": recorder, "other": None, "after": None}
+
+
+def test_benchmark_datasets_are_valid_and_deterministic():
+    from benchmarks.datasets import NOW, PROFILES, generate_feed
+    from sentiment_analyzer import analyze_feed
+
+    for profile in PROFILES.values():
+        payload = generate_feed(600, profile, seed=3)
+        assert payload == generate_feed(600, profile, seed=3)
+        assert len(payload["messages"]) == 600
+        assert all(len(m["content"]) <= 280 for m in payload["messages"])
+        analyze_feed(payload["messages"], payload["time_window_minutes"], NOW)
+
+
+def test_fast_ingest_matches_pydantic_route(monkeypatch):
+    import fast_ingest
+
+    with open("examples/sample_request.json", encoding="utf-8") as f:
+        good = json.load(f)
+    msg = good["messages"][0]
+    variants = [
+        good,
+        dict(good, time_window_minutes=123),
+        dict(good, time_window_minutes=0),
+        dict(good, time_window_minutes=True),
+        dict(good, time_window_minutes="30"),
+        {"messages": [dict(msg, user_id="bad id")], "time_window_minutes": 30},
+        {"messages": [dict(msg, timestamp="2025-09-10 10:00:00")], "time_window_minutes": 30},
+        {"messages": [dict(msg, hashtags=["nohash"])], "time_window_minutes": 30},
+        {"messages": [dict(msg, hashtags=None)], "time_window_minutes": 30},
+        {"messages": [dict(msg, views=True)], "time_window_minutes": 30},
+        {"messages": [dict(msg, views=-1)], "time_window_minutes": 30},
+        {"messages": [dict(msg, views=5.0)], "time_window_minutes": 30},
+        {"messages": [dict(msg, reactions="5")], "time_window_minutes": 30},
+        {"messages": [dict(msg, content=5)], "time_window_minutes": 30},
+        {"messages": [dict(msg, content="x" * 281)], "time_window_minutes": 30},
+        {"messages": [dict(msg, user_id="bad id"), dict(msg, content=None)], "time_window_minutes": 30},
+        {"messages": [{k: v for k, v in msg.items() if k != "id"}], "time_window_minutes": 30},
+        {"messages": [{k: v for k, v in msg.items() if k not in ("hashtags", "views")}], "time_window_minutes": 30},
+        {"messages": [dict(msg, extra={"a": 1})], "time_window_minutes": 30},
+        {"messages": {}, "time_window_minutes": 30},
+        [],
+        dict(good, reference_time="2025-09-10T11:00:00Z"),
+        dict(good, reference_time=None),
+        dict(good, reference_time="2025-09-10 11:00:00"),
+        dict(good, reference_time=1757502000),
+        dict(good, time_windows_minutes=[5, 15, 123, 0, -1, 240]),
+        dict(good, time_windows_minutes=[]),
+        dict(good, time_windows_minutes=[5.0, True]),
+        dict(good, time_windows_minutes="5"),
+    ]
+
+    def call(payload, content_type="application/json"):
+        resp = client.post("/analyze-feed", content=json.dumps(payload), headers={"Content-Type": content_type})
+        body = resp.json()
+        if isinstance(body, dict) and "analysis" in body:
+            body["analysis"].pop("processing_time_ms")
+        return resp.status_code, body
+
+    fast = [call(v) for v in variants] + [call(good, "application/json; charset=utf-8"), call(good, "text/plain")]
+    monkeypatch.setattr(fast_ingest, "orjson", None)
+    slow = [call(v) for v in variants] + [call(good, "application/json; charset=utf-8"), call(good, "text/plain")]
+    assert fast == slow
+    assert fast_ingest.parse_feed(json.dumps(good).encode()) is None  # orjson disabled
+    monkeypatch.undo()
+    assert fast_ingest.parse_feed(json.dumps(good).encode()) is not None
+
+
+def test_fast_timestamp_parser_matches_parse_iso8601():
+    import random
+    from sentiment_analyzer import ValidationError, _EPOCH, _parse_epoch_seconds, parse_iso8601, timestamp_cache_info
+
+    def reference(ts):
+        try:
+            return int((parse_iso8601(ts) - _EPOCH).total_seconds())
+        except ValidationError as e:
+            return e.code, str(e)
+
+    def fast(ts):
+        try:
+            return _parse_epoch_seconds(ts)
+        except ValidationError as e:
+            return e.code, str(e)
+
+    samples = [
+        "2025-09-10T10:00:00Z", " 2025-09-10T10:00:00Z\n", "2024-02-29T23:59:59Z", "2025-02-29T00:00:00Z",
+        "1900-02-29T00:00:00Z", "2000-02-29T00:00:00Z", "0000-01-01T00:00:00Z", "0001-01-01T00:00:00Z",
+        "9999-12-31T23:59:59Z", "1969-12-31T23:59:59Z", "2025-09-10T24:00:00Z", "2025-09-10T23:60:00Z",
+        "2025-09-10T23:59:60Z", "2025-13-01T00:00:00Z", "2025-00-10T00:00:00Z", "2025-09-00T00:00:00Z",
+        "2025-09-10 10:00:00Z", "2025-09-10T10:00:00", "2025-09-10T10:00:00z", "2025-09-10T10:00:00+00:00",
+        "2025-09-10T10:00:00.5Z", "", "Z", "٢٠٢٥-09-10T10:00:00Z", "2025-09-10T10:00:0٠Z", " 2025-09-10T10:00:00Z",
+        "+025-09-10T10:00:00Z", "2025-9-10T10:00:00Z", "2025-09-10T10:00:00ZZ", "2025-09-10T10:00:0²Z",
+        "2025-09-10T1 :00:00Z", "２025-09-10T10:00:00Z",
+    ]
+    rng = random.Random(5)
+    for _ in range(3000):
+        chars = list(rng.choice(samples) or "2025-09-10T10:00:00Z")
+        for _ in range(rng.randint(1, 2)):
+            chars[rng.randrange(len(chars))] = rng.choice("0123456789-T:Z 9٣")
+        samples.append("".join(chars))
+    for ts in samples:
+        assert fast(ts) == reference(ts), ts
+
+    before = timestamp_cache_info()["hits"]
+    _parse_epoch_seconds("2025-09-10T10:00:00Z")
+    assert timestamp_cache_info()["hits"] == before + 1
+
+
+def test_result_cache_keyed_on_reference_time(monkeypatch):
+    import main
+    from result_cache import ResultCache
+
+    monkeypatch.setattr(main, "RESULT_CACHE", ResultCache(2, 60))
+    with open("examples/sample_request.json", encoding="utf-8") as f:
+        payload = json.load(f)
+    payload["reference_time"] = "2025-09-10T11:00:00Z"
+
+    def analysis(resp):
+        assert resp.status_code == 200
+        body = resp.json()
+        assert isinstance(body["analysis"].pop("processing_time_ms"), int)
+        return body
+
+    first = analysis(post_analyze(payload))
+    # Extra keys and message ids do not change the analysis, nor the cache key
+    renamed = dict(payload, messages=[dict(m, id=m["id"] + "_x") for m in payload["messages"]])
+    assert analysis(post_analyze(renamed)) == first
+    assert main.RESULT_CACHE.stats()["hits"] == 1
+    assert main.RESULT_CACHE.stats()["misses"] == 1
+
+    later = dict(payload, reference_time="2025-09-10T12:00:00Z")
+    assert post_analyze(later).status_code == 200
+    assert main.RESULT_CACHE.stats()["misses"] == 2
+
+    # Without reference_time (and no bucket) requests bypass the cache
+    plain = {k: v for k, v in payload.items() if k != "reference_time"}
+    assert post_analyze(plain).status_code == 200
+    assert main.RESULT_CACHE.stats()["misses"] == 2
+
+    bad = dict(payload, reference_time="2025-09-10T11:00:00")
+    resp = post_analyze(bad)
+    assert resp.status_code == 400 and resp.json()["code"] == "INVALID_TIMESTAMP"
+
+    body = client.get("/metrics").text
+    assert "analyze_feed_result_cache_hits_total 1" in body
+    assert "analyze_feed_result_cache_entries 2" in body
+
+
+def test_result_cache_bucket_keeps_real_clock_for_analysis(monkeypatch):
+    import main
+    from datetime import timedelta
+    from result_cache import ResultCache
+
+    monkeypatch.setattr(main, "RESULT_CACHE", ResultCache(4, 60, 3600))
+    just_posted = (datetime.now(timezone.utc) - timedelta(seconds=1)).strftime("%Y-%m-%dT%H:%M:%SZ")
+    payload = {
+        "messages": [{"id": "m1", "content": "Adorei o produto", "timestamp": just_posted,
+                      "user_id": "user_fresh", "hashtags": ["#agora"], "reactions": 1, "views": 10}],
+        "time_window_minutes": 30,
+    }
+    first = post_analyze(payload).json()["analysis"]
+    assert first["trending_topics"] == ["#agora"]
+    assert [u["user_id"] for u in first["influence_ranking"]] == ["user_fresh"]
+    second = post_analyze(payload).json()["analysis"]
+    assert main.RESULT_CACHE.stats()["hits"] == 1
+    assert second["trending_topics"] == ["#agora"]
+    # Same instant as a reference_time: separate entry, analyzed at that instant
+    bucket = main.RESULT_CACHE.bucket_start(datetime.now(timezone.utc))
+    anchored = dict(payload, reference_time=bucket.strftime("%Y-%m-%dT%H:%M:%SZ"))
+    if bucket.strftime("%Y-%m-%dT%H:%M:%SZ") < just_posted:
+        assert post_analyze(anchored).json()["analysis"]["trending_topics"] == []
+
+
+def test_result_cache_lru_and_ttl(monkeypatch):
+    import result_cache
+
+    clock = [100.0]
+    monkeypatch.setattr(result_cache.time, "monotonic", lambda: clock[0])
+    cache = result_cache.ResultCache(2, 10)
+    now = datetime(2025, 9, 10, 11, 0, tzinfo=timezone.utc)
+    keys = [cache.key([{"content": str(i)}], 30, now) for i in range(3)]
+    for i, key in enumerate(keys[:2]):
+        cache.put(key, {"n": i})
+    assert cache.get(keys[0]) == {"n": 0}  # keys[1] is now the least recently used
+    cache.put(keys[2], {"n": 2})
+    assert cache.get(keys[1]) is None
+    assert cache.stats()["evictions"] == 1
+    clock[0] += 11
+    assert cache.get(keys[0]) is None
+    assert cache.stats()["size"] == 1
+    assert result_cache.ResultCache(2, 10, 600).bucket_start(now.replace(minute=7, second=3)) == now
+
+
+def test_sentiment_memo_counts_hits_and_resets_with_lexicon():
+    import sentiment_analyzer as sa
+
+    sa.set_lexicon(None)
+    assert sa.sentiment_cache_info()["size"] == 0
+    assert sa._message_features("user_a", "teste técnico MBRAS!")[2:] == (True, "meta")
+    assert sa._message_features("user_b", "Teste Tecnico mbras")[2:] == (True, "meta")
+    for _ in range(3):
+        assert sa._message_features("user_c", "Super adorei!")[3] == "positive"
+    info = sa.sentiment_cache_info()
+    assert (info["hits"], info["misses"]) == (2, 3)
+    assert info["hit_rate"] == 0.4
+
+    sa.set_lexicon(sa.Lexicon.from_file("examples/lexicon_pt.tsv"))
+    try:
+        assert sa.sentiment_cache_info()["size"] == 0
+        assert sa._message_features("user_c", "nada mal")[3] == "positive"
+    finally:
+        sa.set_lexicon(None)
+    assert sa._message_features("user_c", "nada mal")[3] == "neutral"
+
+
+def test_bounded_executor_rejects_when_full_and_reports_timings():
+    import asyncio
+    import threading
+    from offload import BoundedExecutor, QueueFull
+
+    release = threading.Event()
+
+    async def scenario():
+        executor = BoundedExecutor(1, 1)
+        running = asyncio.ensure_future(executor.run(release.wait))
+        queued = asyncio.ensure_future(executor.run(lambda: 42))
+        await asyncio.sleep(0.05)
+        assert executor.pending == 2
+        try:
+            await executor.run(lambda: 0)
+        except QueueFull:
+            pass
+        else:
+            raise AssertionError("expected QueueFull")
+        release.set()
+        _, _, blocked_for = await running
+        result, queue_wait, _ = await queued
+        assert result == 42
+        assert blocked_for >= 0.04 and queue_wait >= 0.04
+        await asyncio.sleep(0.01)
+        assert executor.pending == 0
+
+    asyncio.run(scenario())
+
+
+def test_analysis_endpoints_answer_503_when_queue_full(monkeypatch):
+    import main
+    from offload import QueueFull
+
+    with open("examples/sample_request.json", encoding="utf-8") as f:
+        payload = json.load(f)
+    resp = post_analyze(payload)
+    assert resp.status_code == 200
+    assert resp.headers["server-timing"].startswith("queue;dur=")
+
+    class Saturated:
+        workers = 4
+
+        async def run(self, fn, *args):
+            raise QueueFull()
+
+    monkeypatch.setattr(main, "ANALYSIS_EXECUTOR", Saturated())
+    # Fast ingestion path, pydantic route (string count coerced) and the batch endpoint
+    coerced = dict(payload, messages=[dict(m, views=str(m.get("views", 0))) for m in payload["messages"]])
+    ndjson = "\n".join(json.dumps(m) for m in payload["messages"])
+    for resp in (
+        *(client.post(path, json=body) for path, body in (
+            ("/analyze-feed", payload), ("/analyze-feed", coerced), ("/analyze-feeds", {"feeds": [payload]}),
+            ("/analyze-feed/session", {"messages": payload["messages"], "time_window_minutes": 30}),
+        )),
+        client.post("/analyze-feed/stream?time_window_minutes=30", content=ndjson, headers={"Content-Type": "application/x-ndjson"}),
+    ):
+        assert resp.status_code == 503
+        assert resp.json() == {"error": "Servidor ocupado; tente novamente em instantes", "code": "SERVER_BUSY"}
+        assert resp.headers["retry-after"] == "1"
+
+
+def test_shared_cache_is_filled_and_read_across_processes(tmp_path):
+    import subprocess
+    import sys
+
+    import sentiment_analyzer as sa
+    from shared_cache import SharedCache
+
+    with open("examples/sample_request.json", encoding="utf-8") as f:
+        payload = json.load(f)
+    now = datetime(2025, 9, 10, 11, 0, tzinfo=timezone.utc)
+    expected = sa.analyze_feed(payload["messages"], 30, now)
+
+    path = str(tmp_path / "shared.bin")
+    # Another process fills the table
+    script = (
+        "import json, sys; from datetime import datetime, timezone;"
+        "import sentiment_analyzer as sa; from shared_cache import SharedCache;"
+        f"sa.set_shared_cache(SharedCache({path!r}, 1024));"
+        f"msgs = json.load(open('examples/sample_request.json'))['messages'];"
+        "sa.analyze_feed(msgs, 30, datetime(2025, 9, 10, 11, 0, tzinfo=timezone.utc));"
+        "sa._shared_cache.close()"
+    )
+    subprocess.run([sys.executable, "-c", script], check=True)
+
+    cache = SharedCache(path)
+    assert cache.capacity == 1024 and cache.entries() > 0
+    sa.set_shared_cache(cache)
+    try:
+        assert sa.analyze_feed(payload["messages"], 30, now) == expected
+        assert cache.stats()["misses"] == 0 and cache.stats()["hits"] > 0
+        assert cache.get_sentiment(sa._lexicon.fingerprint, "Adorei o novo produto!", False) == sa._lexicon_sentiment("Adorei o novo produto!", False)
+        # A different lexicon never reads scores computed with another one
+        assert cache.get_sentiment(sa.Lexicon(["produto"]).fingerprint, "Adorei o novo produto!", False) is None
+    finally:
+        sa.set_shared_cache(None)
+        cache.close()
+
+
+def test_shared_cache_evicts_oldest_and_skips_stored_keys(tmp_path, monkeypatch):
+    import pytest
+
+    import shared_cache
+    from shared_cache import SharedCache
+
+    path = str(tmp_path / "shared.bin")
+    cache = SharedCache(path, shared_cache.WAYS)  # a single bucket
+    for i in range(20):
+        cache.put_followers(f"user_{i:03d}", i)
+    assert cache.get_followers("user_019") is None  # still buffered
+    cache.close()
+
+    cache = SharedCache(path)
+    assert cache.entries() == shared_cache.WAYS
+    # The table keeps taking writes once full, and after a restart
+    assert [cache.get_followers(f"user_{i:03d}") for i in range(20)] == [None] * 12 + list(range(12, 20))
+    cache.put_followers("user_020", 20)
+    cache.flush()
+    assert cache.get_followers("user_012") is None and cache.get_followers("user_020") == 20
+    assert cache.stats()["evictions"] == 1
+
+    # Keys already in the table are dropped from the batch without taking the file lock
+    monkeypatch.setattr(shared_cache.fcntl, "lockf", lambda *args: pytest.fail("locked"))
+    cache.put_followers("user_020", 20)
+    cache.flush()
+    monkeypatch.undo()
+    cache.close()
+
+
+def test_bulk_analyzer_matches_endpoint_and_single_feed(tmp_path):
+    import subprocess
+    import sys
+    import bulk_analyze
+    from sentiment_analyzer import analyze_feed
+
+    with open("examples/sample_request.json", encoding="utf-8") as f:
+        payload = json.load(f)
+    reference_time = "2025-09-10T11:00:00Z"
+    requests_path = tmp_path / "requests.jsonl"
+    bodies = [payload, dict(payload, time_window_minutes=123), dict(payload, time_window_minutes="x")]
+    requests_path.write_text("\n".join(json.dumps(b) for b in bodies) + "\n\n" + json.dumps(payload), encoding="utf-8")
+
+    out = tmp_path / "out.jsonl"
+    assert bulk_analyze.main([str(requests_path), str(out), "--workers", "2", "--chunk-mb", "0.0001", "--reference-time", reference_time]) == 0
+    entries = [json.loads(line) for line in out.read_text(encoding="utf-8").splitlines()]
+    assert [(e["line"], e["status"]) for e in entries] == [(1, 200), (2, 422), (3, 422), (5, 200)]
+    expected = post_analyze(dict(payload, reference_time=reference_time)).json()
+    for entry in (entries[0], entries[3]):
+        entry["analysis"]["processing_time_ms"] = expected["analysis"]["processing_time_ms"]
+        assert entry["analysis"] == expected["analysis"]
+    assert entries[1]["code"] == "UNSUPPORTED_TIME_WINDOW" and entries[2]["code"] == "INVALID_INPUT"
+
+    feed_path = tmp_path / "feed.jsonl"
+    feed_path.write_text("".join(json.dumps(m) + "\n" for m in payload["messages"] * 3), encoding="utf-8")
+    assert bulk_analyze.main([str(feed_path), str(out), "--mode", "feed", "--workers", "2", "--reference-time", reference_time]) == 0
+    (entry,) = [json.loads(line) for line in out.read_text(encoding="utf-8").splitlines()]
+    entry["analysis"].pop("processing_time_ms")
+    now = datetime(2025, 9, 10, 11, 0, tzinfo=timezone.utc)
+    assert entry == {"status": 200, **analyze_feed(payload["messages"] * 3, 30, now)}
+
+    # The offline tool must not pull in the FastAPI app (routes, executor, middleware)
+    probe = subprocess.run([sys.executable, "-c", "import sys, bulk_analyze; print('main' in sys.modules)"], capture_output=True, text=True)
+    assert probe.stdout.strip() == "False", probe.stderr
+
+
+def test_load_harness_reports_percentiles_and_errors(tmp_path):
+    import asyncio
+
+    import httpx
+    from benchmarks.load_test import load_bodies, percentile, run_load
+
+    assert [percentile([1, 2, 3, 4], q) for q in (50, 95, 99)] == [2, 4, 4]
+    with open("examples/sample_request.json", encoding="utf-8") as f:
+        payload = json.load(f)
+    path = tmp_path / "replay.jsonl"
+    path.write_text(json.dumps(payload) + "\n{broken\n" + json.dumps({"other": 1}) + "\n", encoding="utf-8")
+    bodies = load_bodies(str(path), None)
+    assert [n for _, n in bodies] == [len(payload["messages"]), 0]
+
+    async def go():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://asgi") as http:
+            return await run_load(http, bodies, 6, None, 2, None)
+
+    results, elapsed = asyncio.run(go())
+    report = results.report(elapsed)
+    assert report["requests"] == 6 and report["statuses"] == {"200": 3, "422": 3}
+    assert report["error_rate"] == 0.5
+    assert report["latency_ms"]["p50"] <= report["latency_ms"]["p99"] <= report["latency_ms"]["max"]
+    assert len(results.processing) == 3
+
+
+def test_multi_window_matches_one_request_per_window(monkeypatch):
+    import random
+    import sentiment_analyzer
+    from sentiment_analyzer import analyze_feed, analyze_feed_windows
+
+    rng = random.Random(11)
+    now = datetime(2025, 9, 10, 11, 0, 0, 250000, tzinfo=timezone.utc)
+    messages = [
+        {
+            "id": f"m{i}",
+            "content": rng.choice(["adorei o produto", "péssimo serviço", "ok", "não gostei", "muito bom!"]),
+            "timestamp": f"2025-09-10T{rng.randint(6, 11):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}Z",
+            "user_id": f"user_{rng.randint(100, 140)}",
+            "hashtags": rng.sample(["#a", "#b", "#c", "#d"], rng.randint(0, 2)),
+            "reactions": rng.randint(0, 50),
+            "shares": rng.randint(0, 10),
+            "views": rng.randint(1, 500),
+        }
+        for i in range(600)
+    ]
+    windows = [5, 15, 60, 240, 1, 10000]
+    # Reference: one pure Python call per window
+    monkeypatch.setattr(sentiment_analyzer, "NUMPY_MIN_MESSAGES", 10**9)
+    monkeypatch.setattr(sentiment_analyzer, "NUMPY_MIN_USERS", 10**9)
+    expected = {w: analyze_feed(messages, w, now) for w in windows}
+    assert len({r["analysis"]["engagement_score"] for r in expected.values()}) > 1
+    assert analyze_feed_windows(messages, windows, now) == expected
+    if sentiment_analyzer.np is not None:
+        monkeypatch.setattr(sentiment_analyzer, "NUMPY_MIN_MESSAGES", 0)
+        acc = sentiment_analyzer.FeedAccumulator(windows[0], now, windows=windows[1:])
+        for m in messages:
+            acc.add(m)
+        assert sentiment_analyzer._numpy_second_totals(list(acc._second_totals.values())) is not None
+        assert acc.window_results(windows) == expected
+    monkeypatch.undo()
+
+    payload = {"messages": messages, "time_window_minutes": 30, "reference_time": "2025-09-10T11:00:00Z",
+               "time_windows_minutes": [5, 123, 0, 240]}
+    resp = post_analyze(payload)
+    assert resp.status_code == 200
+    body = resp.json()
+    single = post_analyze({k: v for k, v in payload.items() if k != "time_windows_minutes"}).json()
+    body["analysis"].pop("processing_time_ms")
+    single["analysis"].pop("processing_time_ms")
+    assert body["analysis"] == single["analysis"]
+    entries = body["windows"]
+    assert [(e["time_window_minutes"], e["status"]) for e in entries] == [(5, 200), (123, 422), (0, 400), (240, 200)]
+    assert entries[1]["code"] == "UNSUPPORTED_TIME_WINDOW" and entries[2]["code"] == "INVALID_TIME_WINDOW"
+    for entry in (entries[0], entries[3]):
+        alone = post_analyze(dict(payload, time_window_minutes=entry["time_window_minutes"], time_windows_minutes=None)).json()
+        alone["analysis"].pop("processing_time_ms")
+        assert entry["analysis"] == alone["analysis"]
@@ -47,3 +47,16 @@ def test_performance_under_200ms():
     # Target < 200ms for 1000 messages
     assert dt < 200.0, f"Took {dt:.2f} ms"
 
+
+def test_memory_under_20mb_for_10k():
+    if os.getenv("RUN_PERF", "0") != "1":
+        import pytest
+        pytest.skip("Set RUN_PERF=1 to enable performance test")
+    from benchmarks.bench_memory import MB, measure
+
+    body = json.dumps(_gen_dataset(10000)).encode("utf-8")
+    budget_mb = float(os.getenv("MEMORY_BUDGET_MB", "20"))
+    total, stages = measure(body)
+    breakdown = ", ".join(f"{name}={peak / MB:.1f}MB" for name, _, peak in stages)
+    # Target ≤ 20MB peak for 10k messages, request body included
+    assert total / MB <= budget_mb, f"Peak {total / MB:.2f} MB ({breakdown})"